@@ -1,9 +1,13 @@
 """
 Main method for connaisseur. It starts the web server.
 """
+
 import os
 from logging.config import dictConfig
 from connaisseur.flask_server import APP
+from connaisseur.policy import POLICY_WATCHER
+from connaisseur.workload_cache import WORKLOAD_CACHE
+from connaisseur.server import ConnaisseurApplication, get_server_options
 
 if __name__ == "__main__":
     LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
@@ -25,9 +29,17 @@ if __name__ == "__main__":
         }
     )
 
-    # the host needs to be set to `0.0.0.0` so it can be reachable from outside the
-    # container
-    APP.run(
-        host="0.0.0.0",  # nosec
-        ssl_context=("/etc/certs/tls.crt", "/etc/certs/tls.key"),
-    )
+    # the development server is only meant for local testing, as it runs in a
+    # single process
+    if os.environ.get("WEB_SERVER", "gunicorn") == "flask":
+        POLICY_WATCHER.start()
+        WORKLOAD_CACHE.start()
+
+        # the host needs to be set to `0.0.0.0` so it can be reachable from outside
+        # the container
+        APP.run(
+            host="0.0.0.0",  # nosec
+            ssl_context=("/etc/certs/tls.crt", "/etc/certs/tls.key"),
+        )
+    else:
+        ConnaisseurApplication(APP, get_server_options()).run()
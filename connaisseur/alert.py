@@ -1,16 +1,24 @@
 import json
 import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
-import requests
-from jinja2 import Template, StrictUndefined
-from jsonschema import validate as json_validate
+from jinja2 import Environment, StrictUndefined
 
-from connaisseur.util import safe_path_func
+from connaisseur.schema import load_schema, validate as validate_schema
+from connaisseur.session import get_session
+from connaisseur.util import get_container_specs, get_file_signature, safe_path_func
 from connaisseur.exceptions import AlertSendingError, ConfigurationError
 from connaisseur.image import Image
-from connaisseur.mutate import get_container_specs
+
+ALERT_CONFIG_SCHEMA_PATH = "connaisseur/res/alertconfig_schema.json"
+
+# token buckets limiting the alerts per receiver, see `get_token_bucket`
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
 
 
 class Alert:
@@ -52,44 +60,29 @@ class Alert:
         self.headers = self._get_headers(receiver_config)
 
     def _construct_payload(self, receiver_config):
-        try:
-            alert_templates_dir = f'{os.getenv("ALERT_CONFIG_DIR")}/templates'
-            with safe_path_func(
-                open,
-                alert_templates_dir,
-                f"{alert_templates_dir}/{self.template}.json",
-                "r",
-            ) as templatefile:
-                template = json.load(templatefile)
-        except Exception as err:
-            raise ConfigurationError(
-                "Template file for alerting payload is either missing or invalid JSON: {}".format(
-                    str(err)
-                )
-            ) from err
+        template = ALERT_TEMPLATES.get_template(self.template)
         payload = self._render_template(template)
         if receiver_config.get("payload_fields") is not None:
             payload.update(receiver_config.get("payload_fields"))
         return json.dumps(payload)
 
     def _render_template(self, template):
+        # the compiled template is shared, so the payload is rendered into a new
+        # structure
         if isinstance(template, dict):
-            for key in template.keys():
-                template[key] = self._render_template(template[key])
-        elif isinstance(template, list):
-            template[:] = [self._render_template(entry) for entry in template]
-        elif isinstance(template, str):
-            template = Template(template).render(
-                self.context, undefined=StrictUndefined
-            )
+            return {
+                key: self._render_template(value) for key, value in template.items()
+            }
+        if isinstance(template, list):
+            return [self._render_template(entry) for entry in template]
+        if hasattr(template, "render"):
+            return template.render(self.context, undefined=StrictUndefined)
         return template
 
     def send_alert(self):
+        response = None
         try:
-            response = requests.post(
-                self.receiver_url, data=self.payload, headers=self.headers
-            )
-            response.raise_for_status()
+            response = self.post()
             logging.info("sent alert to %s", self.template)
         except Exception as err:
             if self.throw_if_alert_sending_fails:
@@ -97,6 +90,17 @@ class Alert:
             logging.error(err)
         return response
 
+    def post(self):
+        """
+        Posts the alert to its receiver and returns the response. Raises should
+        the alert not be received.
+        """
+        response = get_session("alert").post(
+            self.receiver_url, data=self.payload, headers=self.headers
+        )
+        response.raise_for_status()
+        return response
+
     @staticmethod
     def _get_headers(receiver_config):
         headers = {"Content-Type": "application/json"}
@@ -115,8 +119,7 @@ def load_config():
             open, alert_config_dir, f"{alert_config_dir}/alertconfig.json", "r"
         ) as configfile:
             alertconfig = json.load(configfile)
-        schema = get_alert_config_validation_schema()
-        json_validate(instance=alertconfig, schema=schema)
+        validate_schema(alertconfig, ALERT_CONFIG_SCHEMA_PATH)
     except Exception as err:
         if isinstance(err, FileNotFoundError):
             logging.info(
@@ -135,6 +138,407 @@ def load_config():
     return alertconfig
 
 
+class AlertConfigManager:
+    """
+    Keeps the parsed and validated alert configuration in memory, so the
+    configuration file doesn't need to be read for each admission request.
+
+    The configuration file is only loaded anew, should its inode, modification
+    time or size change, e.g. once kubernetes updated the mounted config map.
+    A missing configuration is kept as well, until the file appears. An
+    invalid configuration is never kept, so that each call raises.
+    """
+
+    def __init__(self):
+        self._configs = {}
+        self._lock = threading.Lock()
+
+    def get_config(self):
+        """
+        Returns the current alert configuration from `ALERT_CONFIG_DIR`.
+        """
+        alert_config_dir = f'{os.getenv("ALERT_CONFIG_DIR", "/app")}'
+        path = f"{alert_config_dir}/alertconfig.json"
+        signature = get_file_signature(path)
+
+        entry = self._configs.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        with self._lock:
+            # the configuration may have been loaded concurrently in the meantime
+            entry = self._configs.get(path)
+            if entry is None or entry[0] != signature:
+                entry = (signature, load_config())
+                self._configs[path] = entry
+        return entry[1]
+
+    def clear(self):
+        """
+        Removes all loaded configurations.
+        """
+        with self._lock:
+            self._configs = {}
+
+
+class AlertTemplateCache:
+    """
+    Keeps the payload templates in memory, with each string of a template
+    compiled to a jinja template, so alerts only need to be rendered.
+
+    Like the alert configuration, a template file is only loaded anew, should
+    its inode, modification time or size change.
+    """
+
+    def __init__(self):
+        self.environment = Environment()
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get_template(self, name: str):
+        """
+        Returns the compiled payload template with the given `name` from the
+        templates directory in `ALERT_CONFIG_DIR`. The template must not be
+        modified.
+
+        Raises a `ConfigurationError` should the template file be missing or
+        invalid JSON.
+        """
+        alert_templates_dir = f'{os.getenv("ALERT_CONFIG_DIR")}/templates'
+        path = f"{alert_templates_dir}/{name}.json"
+        signature = get_file_signature(path)
+
+        entry = self._templates.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        try:
+            with safe_path_func(open, alert_templates_dir, path, "r") as templatefile:
+                template = json.load(templatefile)
+        except Exception as err:
+            raise ConfigurationError(
+                "Template file for alerting payload is either missing or invalid JSON: {}".format(
+                    str(err)
+                )
+            ) from err
+
+        entry = (signature, self._compile(template))
+        with self._lock:
+            self._templates[path] = entry
+        return entry[1]
+
+    def clear(self):
+        """
+        Removes all loaded templates.
+        """
+        with self._lock:
+            self._templates = {}
+
+    def _compile(self, template):
+        if isinstance(template, dict):
+            return {key: self._compile(value) for key, value in template.items()}
+        if isinstance(template, list):
+            return [self._compile(entry) for entry in template]
+        if isinstance(template, str):
+            return self.environment.from_string(template)
+        return template
+
+
+class AlertDispatcher:
+    """
+    Sends alerts in the background, so that slow or unavailable receivers
+    don't delay the admission requests. Alerts are queued in a bounded queue
+    and sent by a pool of worker threads, which are started with the first
+    alert. A failed alert is retried with exponential backoff.
+
+    Should the queue be full, further alerts are dropped. The numbers of
+    sent, failed, dropped and rate limited alerts are counted and logged once
+    the queue is drained. As the worker threads don't keep the process alive,
+    the queue needs to be drained before exiting.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 1000,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.counters = {"sent": 0, "failed": 0, "dropped": 0, "rate_limited": 0}
+        self._threads = None
+        self._lock = threading.Lock()
+
+    def dispatch(self, alert: Alert, rate_limit: dict = None):
+        """
+        Queues the `alert` for sending, or drops it should the queue be full or
+        should the `rate_limit` of its receiver be exceeded.
+        """
+        if not get_token_bucket(alert, rate_limit).consume():
+            self._count("rate_limited")
+            logging.warning("rate limit exceeded, dropped alert to %s.", alert.template)
+            return
+
+        self.start()
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            self._count("dropped")
+            logging.error("alert queue is full, dropped alert to %s.", alert.template)
+
+    def start(self):
+        """
+        Starts the worker threads, unless they were already started.
+        """
+        with self._lock:
+            if self._threads is not None:
+                return
+            self._threads = [
+                threading.Thread(
+                    target=self._run, name=f"alert-dispatcher-{index}", daemon=True
+                )
+                for index in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def drain(self, timeout: float):
+        """
+        Waits up to `timeout` seconds for all queued alerts to be sent and logs
+        the alert counters. Returns `False` should alerts still be queued after
+        the timeout.
+        """
+        deadline, drained = time.monotonic() + timeout, True
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.warning(
+                        "%s alerts weren't sent before shutdown.",
+                        self.queue.unfinished_tasks,
+                    )
+                    drained = False
+                    break
+                self.queue.all_tasks_done.wait(remaining)
+
+        with self._lock:
+            logging.info(
+                "alerts sent: %(sent)s, failed: %(failed)s, dropped: %(dropped)s, "
+                "rate limited: %(rate_limited)s",
+                self.counters,
+            )
+        return drained
+
+    def send(self, alert: Alert):
+        """
+        Sends the `alert`, retrying it up to `retries` times with exponential
+        backoff.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                alert.post()
+            except Exception as err:  # pylint: disable=broad-except
+                if attempt == self.retries:
+                    self._count("failed")
+                    logging.error("failed to send alert to %s: %s", alert.template, err)
+                    return False
+                time.sleep(self.backoff * 2**attempt)
+            else:
+                self._count("sent")
+                logging.info("sent alert to %s", alert.template)
+                return True
+
+    def _run(self):
+        while True:
+            alert = self.queue.get()
+            try:
+                self.send(alert)
+            finally:
+                self.queue.task_done()
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+
+class TokenBucket:
+    """
+    Token bucket, which holds up to `burst` tokens and is refilled with `rate`
+    tokens per second. A `rate` of `None` doesn't limit anything.
+    """
+
+    def __init__(self, rate: float = None, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self):
+        """
+        Takes a token from the bucket and returns `True`, or returns `False`
+        should the bucket be empty.
+        """
+        if self.rate is None:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def get_token_bucket(alert: Alert, rate_limit: dict = None):
+    """
+    Returns the shared token bucket for the receiver of the `alert` and its
+    `rate_limit`, as configured for the receiver.
+    """
+    rate_limit = rate_limit or {}
+    key = (
+        alert.receiver_url,
+        alert.template,
+        rate_limit.get("rate"),
+        rate_limit.get("burst", 1),
+    )
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            bucket = _BUCKETS[key] = TokenBucket(key[2], key[3])
+    return bucket
+
+
+class AlertAggregator:
+    """
+    Folds similar alerts for a receiver, which sets an `aggregation_window`.
+    Alerts are similar, should they be caused by the same event for the same
+    images in the same namespace.
+
+    The first alert of a window is sent right away, all similar alerts within
+    the following `aggregation_window` seconds are only counted. Once the
+    window closed, they are sent as a single summarized alert.
+    """
+
+    def __init__(self, dispatcher: AlertDispatcher, flush_interval: float = 1):
+        self.dispatcher = dispatcher
+        self.flush_interval = flush_interval
+        self.windows = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add(self, receiver: dict, event: str, message: str, admission_request: dict):
+        """
+        Adds the alert to the current window of similar alerts for the
+        `receiver`. Returns `True` should the alert be folded into the window,
+        otherwise `False`, so that it needs to be sent.
+        """
+        window = receiver.get("aggregation_window", 0)
+        if not window:
+            return False
+
+        key = (
+            receiver["receiver_url"],
+            receiver["template"],
+            event,
+            tuple(sorted(get_images(admission_request))),
+            admission_request.get("request", {}).get("namespace"),
+        )
+        self.start()
+        now = time.monotonic()
+        with self._lock:
+            previous = self.windows.get(key)
+            if previous is not None and previous["end"] > now:
+                previous.update(
+                    count=previous["count"] + 1,
+                    message=message,
+                    admission_request=admission_request,
+                )
+                return True
+            self.windows[key] = {
+                "end": now + window,
+                "count": 0,
+                "receiver": receiver,
+                "message": message,
+                "admission_request": admission_request,
+            }
+
+        # the previous window closed, but wasn't flushed yet
+        if previous is not None:
+            self._send_summary(previous)
+        return False
+
+    def flush(self, close_all: bool = False):
+        """
+        Sends the summarized alerts of all closed windows, or of all windows
+        should `close_all` be set, e.g. before exiting.
+        """
+        now = time.monotonic()
+        with self._lock:
+            closed = [
+                key
+                for key, window in self.windows.items()
+                if close_all or window["end"] <= now
+            ]
+            closed = [self.windows.pop(key) for key in closed]
+        for window in closed:
+            self._send_summary(window)
+
+    def start(self):
+        """
+        Starts flushing closed windows every `flush_interval` seconds, unless
+        already started or the interval is 0.
+        """
+        with self._lock:
+            if self._thread is not None or not self.flush_interval:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="alert-aggregator", daemon=True
+            )
+        self._thread.start()
+
+    def _send_summary(self, window: dict):
+        if not window["count"]:
+            return
+
+        receiver = window["receiver"]
+        message = "{} (and {} similar alerts within {} seconds)".format(
+            window["message"], window["count"], receiver["aggregation_window"]
+        )
+        try:
+            alert = Alert(message, receiver, window["admission_request"])
+        except ConfigurationError as err:
+            logging.error(err.message)
+            return
+        self.dispatcher.dispatch(alert, receiver.get("rate_limit"))
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as err:  # pylint: disable=broad-except
+                logging.error("error while sending summarized alerts: %s", err)
+
+
+ALERT_CONFIG = AlertConfigManager()
+ALERT_TEMPLATES = AlertTemplateCache()
+ALERT_DISPATCHER = AlertDispatcher(
+    workers=int(os.environ.get("ALERT_WORKERS", "2")),
+    queue_size=int(os.environ.get("ALERT_QUEUE_SIZE", "1000")),
+    retries=int(os.environ.get("ALERT_RETRIES", "3")),
+    backoff=float(os.environ.get("ALERT_RETRY_BACKOFF", "0.5")),
+)
+ALERT_AGGREGATOR = AlertAggregator(ALERT_DISPATCHER)
+
+
 def get_images(admission_request):
     relevant_spec = get_container_specs(
         admission_request.get("request", {}).get("object", {})
@@ -143,7 +547,7 @@ def get_images(admission_request):
 
 
 def send_alerts(admission_request, *, admitted, reason=None):
-    alert_config = load_config()
+    alert_config = ALERT_CONFIG.get_config()
     event_category = "admit_request" if admitted else "reject_request"
     if alert_config.get(event_category) is not None:
         for receiver in alert_config[event_category]["templates"]:
@@ -152,8 +556,17 @@ def send_alerts(admission_request, *, admitted, reason=None):
                 if admitted
                 else "CONNAISSEUR rejected a request: {}".format(reason)
             )
-            alert = Alert(message, receiver, admission_request)
-            alert.send_alert()
+            # alerts, that must be received for the request to be admitted, are sent
+            # right away
+            if receiver.get("fail_if_alert_sending_fails", False):
+                Alert(message, receiver, admission_request).send_alert()
+            elif not ALERT_AGGREGATOR.add(
+                receiver, event_category, message, admission_request
+            ):
+                ALERT_DISPATCHER.dispatch(
+                    Alert(message, receiver, admission_request),
+                    receiver.get("rate_limit"),
+                )
 
 
 def call_alerting_on_request(admission_request, *, admitted):
@@ -182,7 +595,7 @@ def call_alerting_on_request(admission_request, *, admitted):
 
 
 def no_alerting_configured_for_event(admitted):
-    config = load_config()
+    config = ALERT_CONFIG.get_config()
     templates = (
         config.get("admit_request") if admitted else config.get("reject_request")
     )
@@ -190,5 +603,4 @@ def no_alerting_configured_for_event(admitted):
 
 
 def get_alert_config_validation_schema():
-    with open("connaisseur/res/alertconfig_schema.json") as schemafile:
-        return json.load(schemafile)
+    return load_schema(ALERT_CONFIG_SCHEMA_PATH)
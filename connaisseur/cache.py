@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with a bounded number of entries, each of
+    which expires after a time to live (`ttl`, in seconds). Should the cache
+    be full, the least recently used entry is evicted.
+
+    A `ttl` of `None` lets entries live until they are evicted, a `maxsize`
+    or `ttl` of 0 disables the cache.
+    """
+
+    maxsize: int
+    ttl: float
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for `key`, or `default` should there be no
+        such entry or should it be expired.
+        """
+        with self._lock:
+            try:
+                value, expires = self._entries[key]
+            except KeyError:
+                return default
+
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Stores `value` for `key`. The cache's default time to live is used,
+        unless a shorter `ttl` is given.
+        """
+        if self.ttl is not None and (ttl is None or ttl > self.ttl):
+            ttl = self.ttl
+
+        if self.maxsize <= 0 or (ttl is not None and ttl <= 0):
+            return
+
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Removes the entry for `key` and returns its value, or `default` should
+        there be no such entry.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key, so that only the first call
+    is executed, while all others wait for it and share its result. Should
+    the call raise, each caller raises its own copy of the error, so callers
+    may modify it without affecting each other.
+
+    Results aren't kept once the call is done, so later calls are executed
+    again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func: callable, *args, **kwargs):
+        """
+        Executes `func` with the given arguments and returns its result,
+        unless a call with the same `key` is already in flight. Then its
+        result is returned instead.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            in_flight = call is not None
+            if not in_flight:
+                call = self._calls[key] = _Call()
+
+        if in_flight:
+            call.done.wait()
+            if call.error is not None:
+                raise _copy_error(call.error)
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as err:  # pylint: disable=broad-except
+            call.error = err
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        # raised outside of the except block, so the copy keeps the original
+        # error's chain instead of being chained to it
+        if call.error is not None:
+            raise _copy_error(call.error)
+        return call.result
+
+    def __len__(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _copy_error(error: Exception):
+    # each caller raises its own error, so that tracebacks aren't mixed up between
+    # threads. errors are copied without calling their `__init__`, as their
+    # arguments may differ from `args`
+    error_copy = type(error).__new__(type(error), *error.args)
+    error_copy.__dict__.update(error.__dict__)
+    # keep the underlying errors and the traceback for logging
+    error_copy.__cause__ = error.__cause__
+    error_copy.__context__ = error.__context__
+    error_copy.__suppress_context__ = error.__suppress_context__
+    return error_copy.with_traceback(error.__traceback__)
@@ -1,35 +1,164 @@
+import functools
 import hashlib
 import base64
+import os
 import ecdsa
 
+try:
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+except ImportError:  # pragma: no cover
+    ec = None
+
+from connaisseur.cache import TTLCache
 from connaisseur.exceptions import InvalidPublicKey
 
+# successful signature verifications, keyed by public key, message digest and
+# signature. failed verifications are never cached
+VERIFICATION_CACHE = TTLCache(
+    maxsize=int(os.environ.get("SIGNATURE_CACHE_SIZE", "1024"))
+)
+
 
-def verify_signature(public_base64: str, signature_base64: str, message: str):
+def verify_signature(public_base64: str, signature_base64: str, message):
     """
     Verifies the given bas64-encoded signature with the base64-encoded public
-    key and serialized message. The message should not contain any whitespaces.
+    key and serialized message, given as `str` or `bytes`. The message should
+    not contain any whitespaces.
 
     Raises ValidationError if unsuccessful.
+
+    Successful verifications are cached, so verifying the same signature of
+    the same message again doesn't need any cryptographic operations.
     """
-    pub_key = decode_and_verify_ecdsa_key(public_base64)
+    msg_bytes = message if isinstance(message, bytes) else bytes(message, "utf-8")
 
-    signature = base64.b64decode(signature_base64)
+    cache_key = (public_base64, hashlib.sha256(msg_bytes).digest(), signature_base64)
+    if VERIFICATION_CACHE.get(cache_key):
+        return True
+
+    backend = get_backend()
+    pub_key = decode_and_verify_ecdsa_key(public_base64, backend)
 
-    msg_bytes = bytearray(message, "utf-8")
+    signature = base64.b64decode(signature_base64)
 
-    return pub_key.verify(signature, msg_bytes, hashfunc=hashlib.sha256)
+    verified = backend.verify(pub_key, signature, msg_bytes)
+    if verified:
+        VERIFICATION_CACHE.set(cache_key, True)
+    return verified
 
 
-def decode_and_verify_ecdsa_key(public_base64: str):
+def decode_and_verify_ecdsa_key(public_base64: str, backend=None):
     """
     Verifies that the provided public key in base64 encoding qualifies as a
     proper ecdsa key and throws if not.
+
+    Parsed keys are cached, so that each key is only parsed once.
     """
+    backend = backend or get_backend()
     try:
-        public = base64.b64decode(public_base64)
-        return ecdsa.VerifyingKey.from_der(public)
+        return backend.load_key(public_base64)
     except Exception as err:
         raise InvalidPublicKey(
             f"The public key provided is not a base64-encoded ECDSA key: {err}."
         ) from err
+
+
+def get_backend():
+    """
+    Returns the backend used for signature verification, which can be set
+    with the `CRYPTO_BACKEND` environment variable. The OpenSSL-based
+    "cryptography" backend is used by default, unless the package isn't
+    installed. Then the pure-python "ecdsa" backend is used instead.
+    """
+    if os.environ.get("CRYPTO_BACKEND", "cryptography") == "ecdsa" or ec is None:
+        return ECDSA_BACKEND
+    return CRYPTOGRAPHY_BACKEND
+
+
+@functools.lru_cache(maxsize=int(os.environ.get("KEY_CACHE_SIZE", "128")))
+def load_ecdsa_key(public_base64: str):
+    """
+    Parses the base64-encoded public key and precomputes its point
+    multiplication tables, which speeds up all following signature
+    verifications with the key.
+    """
+    public = base64.b64decode(public_base64)
+    key = ecdsa.VerifyingKey.from_der(public)
+
+    # the point of a key parsed from DER lacks the curve order, which is needed
+    # for the precomputation
+    point = key.pubkey.point
+    key = ecdsa.VerifyingKey.from_public_point(
+        ecdsa.ellipticcurve.Point(point.curve(), point.x(), point.y(), key.curve.order),
+        curve=key.curve,
+    )
+    # precompute eagerly, so that the shared key isn't modified by concurrent
+    # verifications later on
+    key.precompute()
+    return key
+
+
+@functools.lru_cache(maxsize=int(os.environ.get("KEY_CACHE_SIZE", "128")))
+def load_cryptography_key(public_base64: str):
+    """
+    Parses the base64-encoded public key with `cryptography`.
+
+    Raises a `ValueError` should the key not be an ECDSA key.
+    """
+    public = base64.b64decode(public_base64)
+    key = serialization.load_der_public_key(public)
+    if not isinstance(key, ec.EllipticCurvePublicKey):
+        raise ValueError("not an elliptic curve key")
+    return key
+
+
+class EcdsaBackend:
+    """
+    Verifies signatures with the pure-python `ecdsa` package.
+    """
+
+    name = "ecdsa"
+
+    @staticmethod
+    def load_key(public_base64: str):
+        return load_ecdsa_key(public_base64)
+
+    @staticmethod
+    def verify(key, signature: bytes, message: bytes):
+        return key.verify(signature, message, hashfunc=hashlib.sha256)
+
+
+class CryptographyBackend:
+    """
+    Verifies signatures with the `cryptography` package, which uses OpenSSL.
+    """
+
+    name = "cryptography"
+
+    @staticmethod
+    def load_key(public_base64: str):
+        return load_cryptography_key(public_base64)
+
+    @staticmethod
+    def verify(key, signature: bytes, message: bytes):
+        # TUF signatures consist of the raw concatenated `r` and `s` values,
+        # whereas OpenSSL expects them DER-encoded
+        size = (key.curve.key_size + 7) // 8
+        if len(signature) != 2 * size:
+            raise ValueError(
+                f"invalid signature length {len(signature)}, expected {2 * size}."
+            )
+        r_value = int.from_bytes(signature[:size], "big")
+        s_value = int.from_bytes(signature[size:], "big")
+        key.verify(
+            encode_dss_signature(r_value, s_value),
+            message,
+            ec.ECDSA(hashes.SHA256()),
+        )
+        return True
+
+
+ECDSA_BACKEND = EcdsaBackend()
+CRYPTOGRAPHY_BACKEND = CryptographyBackend()
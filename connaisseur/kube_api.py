@@ -1,5 +1,9 @@
+import json
 import os
-import requests
+import threading
+import time
+from connaisseur.session import create_session
+from connaisseur.util import get_file_signature, get_token_expiry
 
 
 def request_kube_api(path: str):
@@ -7,21 +11,19 @@ def request_kube_api(path: str):
     Makes an API call to the underlying kubernetes cluster with the given
     `path`.
     """
+    return KUBE_CLIENT.request(path)
 
-    token_path = os.environ.get("KUBE_API_TOKEN_PATH")
-    ca_path = os.environ.get("KUBE_API_CA_PATH")
-    kube_ip = os.environ.get("KUBERNETES_SERVICE_HOST")
-    kube_port = os.environ.get("KUBERNETES_SERVICE_PORT")
 
-    token = get_token(token_path)
-
-    url = f"https://{kube_ip}:{kube_port}/{path}"
-    headers = {"Authorization": f"Bearer {token}"}
-
-    response = requests.get(url, verify=ca_path, headers=headers)
-    response.raise_for_status()
+def watch_kube_api(path: str, resource_version: str, timeout: int = 300):
+    """
+    Watches the resources found under the given `path` of the underlying
+    kubernetes cluster for changes, starting from `resource_version`. The
+    kubernetes API closes the watch after `timeout` seconds.
 
-    return response.json()
+    Yields the watch events as a `dict`, containing the event `type` and the
+    changed `object`.
+    """
+    return KUBE_CLIENT.watch(path, resource_version, timeout)
 
 
 def get_token(path: str):
@@ -30,3 +32,115 @@ def get_token(path: str):
     """
     with open(path, "r") as file:
         return file.read()
+
+
+class KubeClient:
+    """
+    Client for the API of the underlying kubernetes cluster.
+
+    The service account token is kept in memory and only read again, once the
+    projected token file changes or the token is about to expire. The file is
+    checked for changes at most every `check_interval` seconds. The CA bundle
+    is set on the client's own session, so that it needn't be passed with each
+    request and TLS connections are kept alive.
+    """
+
+    def __init__(self, check_interval: float = 10, expiry_leeway: float = 60):
+        self.check_interval = check_interval
+        self.expiry_leeway = expiry_leeway
+        self._lock = threading.Lock()
+        self._session = None
+        self._base_url = None
+        self._token = _TokenState()
+
+    def request(self, path: str):
+        response = self.get_session().get(
+            self.get_url(path), headers=self.get_headers()
+        )
+        response.raise_for_status()
+
+        return response.json()
+
+    def watch(self, path: str, resource_version: str, timeout: int = 300):
+        params = {
+            "watch": "1",
+            "resourceVersion": resource_version,
+            "timeoutSeconds": str(timeout),
+            "allowWatchBookmarks": "true",
+        }
+
+        # the connection stays idle until an event occurs, so the read timeout
+        # must outlast the watch itself
+        with self.get_session().get(
+            self.get_url(path),
+            headers=self.get_headers(),
+            params=params,
+            stream=True,
+            timeout=(10, timeout + 30),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def get_session(self):
+        """
+        Returns the client's session, which is set up from the environment on
+        first use.
+        """
+        with self._lock:
+            if self._session is None:
+                kube_ip = os.environ.get("KUBERNETES_SERVICE_HOST")
+                kube_port = os.environ.get("KUBERNETES_SERVICE_PORT")
+                self._base_url = f"https://{kube_ip}:{kube_port}"
+                self._token.path = os.environ.get("KUBE_API_TOKEN_PATH")
+
+                session = create_session("kube_api")
+                session.verify = os.environ.get("KUBE_API_CA_PATH")
+                self._session = session
+            return self._session
+
+    def get_url(self, path: str):
+        self.get_session()
+        return f"{self._base_url}/{path}"
+
+    def get_headers(self):
+        return {"Authorization": f"Bearer {self.get_token()}"}
+
+    def get_token(self):
+        """
+        Returns the service account token, reading it from the file system
+        only if it wasn't read before, the token file changed or the token is
+        about to expire.
+        """
+        self.get_session()
+        now = time.time()
+        token = self._token
+        with self._lock:
+            expiring = (
+                token.expiry is not None and token.expiry - self.expiry_leeway <= now
+            )
+            if token.value is not None and not expiring and now < token.next_check:
+                return token.value
+
+            signature = get_file_signature(token.path)
+            if token.value is None or expiring or signature != token.signature:
+                token.value = get_token(token.path)
+                token.signature = signature
+                token.expiry = get_token_expiry(token.value)
+            token.next_check = now + self.check_interval
+            return token.value
+
+
+class _TokenState:
+    def __init__(self):
+        self.path = None
+        self.value = None
+        self.signature = None
+        self.expiry = None
+        self.next_check = 0
+
+
+KUBE_CLIENT = KubeClient(
+    check_interval=float(os.environ.get("KUBE_API_TOKEN_CHECK_INTERVAL", "10"))
+)
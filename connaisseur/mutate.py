@@ -1,11 +1,16 @@
+import json
 import logging
 import os
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from connaisseur.image import Image
 from connaisseur.validate import get_trusted_digest
 from connaisseur.admission_review import get_admission_review
+from connaisseur.cache import SingleFlight
 from connaisseur.kube_api import request_kube_api
 from connaisseur.exceptions import BaseConnaisseurException, UnknownVersionError
-from connaisseur.policy import ImagePolicy
+from connaisseur.policy import POLICY_WATCHER
+from connaisseur.util import get_container_specs
+from connaisseur.workload_cache import WORKLOAD_CACHE
 
 SUPPORTED_API_VERSIONS = {
     "Pod": ["v1"],
@@ -18,35 +23,16 @@ SUPPORTED_API_VERSIONS = {
     "CronJob": ["batch/v1beta1", "batch/v2alpha1"],
 }
 
+# bounded pool of threads, which concurrently verify the images of admission requests
+VERIFY_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("CONTAINER_VERIFY_WORKERS", "8")),
+    thread_name_prefix="verify",
+)
 
-def get_container_specs(request_object: dict):
-    """
-    Returns the container specifications of the `request_object`, based on its
-    type.
-    """
-    object_kind = request_object.get("kind")
-    if object_kind == "Pod":
-        relevant_spec = request_object["spec"]
-        init_containers = relevant_spec.get("initContainers", [])
-        return relevant_spec["containers"] + init_containers
-    elif object_kind == "CronJob":
-        relevant_spec = request_object["spec"]["jobTemplate"]["spec"]["template"][
-            "spec"
-        ]
-        init_containers = relevant_spec.get("initContainers", [])
-        return relevant_spec["containers"] + init_containers
-    elif object_kind in (
-        "Deployment",
-        "ReplicationController",
-        "ReplicaSet",
-        "DaemonSet",
-        "StatefulSet",
-        "Job",
-    ):
-        relevant_spec = request_object["spec"]["template"]["spec"]
-        init_containers = relevant_spec.get("initContainers", [])
-        return relevant_spec["containers"] + init_containers
-    return []
+# concurrent admission requests, e.g. of all pods of a scaled up replica set, share
+# the verification of the same image and the lookup of the same parent object
+DIGEST_REQUESTS = SingleFlight()
+PARENT_REQUESTS = SingleFlight()
 
 
 def get_json_patch(object_kind: str, index: int, image_name: str):
@@ -82,7 +68,8 @@ def get_json_patch(object_kind: str, index: int, image_name: str):
 def get_parent_images(request: dict, index: int, namespace: str):
     """
     Requests the kube API for the parent object, found in the `request` at
-    `index` and searches for all image name references in there.
+    `index` and searches for all image name references in there. Should the
+    parent object be known to the `WORKLOAD_CACHE`, no request is needed.
 
     Return the found image references as a `list`. The list is empty if none
     were found.
@@ -93,10 +80,15 @@ def get_parent_images(request: dict, index: int, namespace: str):
     name = owner["name"]
     uid = owner["uid"]
 
+    # the images of most parent objects are already known from the workload
+    # cache, otherwise the parent object is requested
+    acceptable_images = WORKLOAD_CACHE.get_images(namespace, kind, name, uid)
+    if acceptable_images is not None:
+        return acceptable_images
+
     # get parent object
-    parent = request_kube_api(
-        f"apis/{api_version}/namespaces/{namespace}/{kind.lower()}s/{name}"
-    )
+    path = f"apis/{api_version}/namespaces/{namespace}/{kind.lower()}s/{name}"
+    parent = PARENT_REQUESTS.do(path, request_kube_api, path)
 
     if parent["metadata"]["uid"] != uid:
         msg = "owner uid and found parent uid do not match."
@@ -203,57 +195,95 @@ def admit(request: dict):
             ):
                 acceptable_images += get_parent_images(request, index, namespace)
 
-    policy = ImagePolicy()
+    policy = POLICY_WATCHER.get_policy()
 
-    # validate all images from the request
-    for index, container in enumerate(containers):
-        try:
-            logging_context = create_logging_context(request, container["image"])
-
-            # child approval
-            if container["image"] in acceptable_images:
-                msg = 'automatic child approval for "{}".'.format(container["image"])
-                logging.info(str({"message": msg, "context": logging_context}))
-                continue
-
-            image = Image(container["image"])
-
-            policy_rule = policy.get_matching_rule(image)
-            verify = policy_rule.get("verify", True)
-
-            # if image doesn't need verification, continue
-            if not verify:
-                msg = 'no verification for image "{}".'.format(str(image))
-                logging.info(str({"message": msg, "context": logging_context}))
-                continue
-
-            msg = 'start verification of image "{}".'.format(str(image))
-            logging.debug(
-                str(
-                    {
-                        "message": msg,
-                        "context": dict(
-                            logging_context, matching_rule=policy_rule.get("pattern")
-                        ),
-                    }
-                )
+    # validate all distinct images from the request concurrently
+    futures = {}
+    for container in containers:
+        if container["image"] not in futures:
+            futures[container["image"]] = VERIFY_EXECUTOR.submit(
+                verify_image, request, container["image"], acceptable_images, policy
             )
 
-            # get signed digest and update image reference with the digest
-            trusted_digest = get_trusted_digest(
-                os.environ.get("NOTARY_SERVER"), image, policy_rule
-            )
-            image.set_digest(trusted_digest)
+    # stop at the first failure and cancel all verifications, that didn't start yet
+    done, not_done = wait(futures.values(), return_when=FIRST_EXCEPTION)
+    for future in not_done:
+        future.cancel()
+
+    # raise the error of the first failed container, in order of the containers
+    for future in futures.values():
+        if future in done and future.exception():
+            raise future.exception()
+
+    for index, container in enumerate(containers):
+        image_name = futures[container["image"]].result()
+        if image_name:
             patches += [
                 get_json_patch(
-                    object_kind=object_kind, index=index, image_name=str(image)
+                    object_kind=object_kind, index=index, image_name=image_name
                 )
             ]
 
-            msg = 'successful verification of image "{}"'.format(str(image))
+    return get_admission_review(uid, True, patch=patches)
+
+
+def verify_image(request: dict, image_name: str, acceptable_images: list, policy):
+    """
+    Validates the image with `image_name` from the `request` against the
+    matching rule of the `policy`, unless it is part of the
+    `acceptable_images`.
+
+    Returns the image name with its trusted digest, or `None` should the image
+    not need to be changed.
+    """
+    try:
+        logging_context = create_logging_context(request, image_name)
+
+        # child approval
+        if image_name in acceptable_images:
+            msg = 'automatic child approval for "{}".'.format(image_name)
             logging.info(str({"message": msg, "context": logging_context}))
-        except BaseConnaisseurException as err:
-            err.context.update(logging_context)
-            raise err
+            return None
 
-    return get_admission_review(uid, True, patch=patches)
+        image = Image(image_name)
+
+        policy_rule = policy.get_matching_rule(image)
+        verify = policy_rule.get("verify", True)
+
+        # if image doesn't need verification, continue
+        if not verify:
+            msg = 'no verification for image "{}".'.format(str(image))
+            logging.info(str({"message": msg, "context": logging_context}))
+            return None
+
+        msg = 'start verification of image "{}".'.format(str(image))
+        logging.debug(
+            str(
+                {
+                    "message": msg,
+                    "context": dict(
+                        logging_context, matching_rule=policy_rule.get("pattern")
+                    ),
+                }
+            )
+        )
+
+        # get signed digest and update image reference with the digest
+        host = os.environ.get("NOTARY_SERVER")
+        trusted_digest = DIGEST_REQUESTS.do(
+            (host, str(image), json.dumps(policy_rule, sort_keys=True)),
+            get_trusted_digest,
+            host,
+            image,
+            policy_rule,
+        )
+        image.set_digest(trusted_digest)
+
+        msg = 'successful verification of image "{}"'.format(str(image))
+        logging.info(str({"message": msg, "context": logging_context}))
+        return str(image)
+    except BaseConnaisseurException as err:
+        # the error is a copy of the one raised for all concurrent verifications
+        # of the same image, whose context it still shares
+        err.context = dict(err.context, **logging_context)
+        raise err
@@ -1,15 +1,42 @@
+import json
 import os
 import re
+import time
 from urllib.parse import quote, urlencode
 import requests
+from connaisseur.cache import TTLCache
 from connaisseur.image import Image
+from connaisseur.session import get_session
 from connaisseur.exceptions import (
     NotFoundException,
     UnsupportedTypeException,
     InvalidFormatException,
+    ValidationError,
 )
 from connaisseur.tuf_role import TUFRole
 from connaisseur.trust_data import TrustData
+from connaisseur.util import get_token_expiry
+
+# bearer tokens, keyed by the URL they were requested from. since the URL contains
+# realm, service and scope, a token is only reused for the same repository
+TOKEN_CACHE = TTLCache(maxsize=int(os.environ.get("NOTARY_TOKEN_CACHE_SIZE", "256")))
+
+# URLs from which the notary server's bearer tokens can be requested, keyed by the
+# repository's notary URL, so that a cached token can be sent with the first request
+AUTH_URLS = TTLCache(maxsize=int(os.environ.get("NOTARY_TOKEN_CACHE_SIZE", "256")))
+
+# tokens are discarded this many seconds before they actually expire, to account for
+# clock skew and the time requests take
+TOKEN_EXPIRY_LEEWAY = 10
+
+# default lifetime of a token in seconds, should the auth server not provide any
+DEFAULT_TOKEN_LIFETIME = 60
+
+# maximum size of a trust data document in bytes, which is downloaded
+MAX_TRUST_DATA_SIZE = int(os.environ.get("NOTARY_MAX_TRUST_DATA_SIZE", "16777216"))
+
+# size of the chunks in which trust data is read
+CHUNK_SIZE = 64 * 1024
 
 
 def health_check(host: str):
@@ -30,7 +57,7 @@ def health_check(host: str):
     request_kwargs = {"url": url}
     if is_notary_selfsigned():
         request_kwargs["verify"] = "/etc/certs/notary.crt"
-    response = requests.get(**request_kwargs)
+    response = get_session("notary").get(**request_kwargs)
 
     return response.status_code == 200
 
@@ -51,39 +78,77 @@ def is_notary_selfsigned():
     return os.environ.get("SELFSIGNED_NOTARY", "0") == "1"
 
 
-def get_trust_data(host: str, image: Image, role: TUFRole, token: str = None):
+def get_trust_data(
+    host: str, image: Image, role: TUFRole, token: str = None, max_length: int = None
+):
     """
     Request the specific trust data, denoted by the `role` and `image` from
     the notary server (`host`). Uses a token, should authentication be
     required.
+
+    Unless a `token` is given, a cached token for the `image`'s repository is
+    sent along. Should the notary server reject the request, a new token is
+    requested and the request is repeated once.
+
+    The trust data is downloaded in chunks and may be at most `max_length`
+    bytes long, should its length be known, but never larger than
+    `MAX_TRUST_DATA_SIZE`.
     """
     if image.repository:
-        url = (
-            f"https://{host}/v2/{image.registry}/{image.repository}/"
-            f"{image.name}/_trust/tuf/{role.role}.json"
-        )
+        repo_url = f"https://{host}/v2/{image.registry}/{image.repository}/{image.name}"
     else:
-        url = (
-            f"https://{host}/v2/{image.registry}/"
-            f"{image.name}/_trust/tuf/{role.role}.json"
-        )
+        repo_url = f"https://{host}/v2/{image.registry}/{image.name}"
+    url = f"{repo_url}/_trust/tuf/{role.role}.json"
 
-    request_kwargs = {"url": url}
+    retry = token is None
+    if retry:
+        token = get_cached_auth_token(repo_url)
+
+    request_kwargs = {"url": url, "stream": True}
     if token:
         request_kwargs["headers"] = {"Authorization": f"Bearer {token}"}
     if is_notary_selfsigned():
         request_kwargs["verify"] = "/etc/certs/notary.crt"
-    response = requests.get(**request_kwargs)
+    response = get_session("notary").get(**request_kwargs)
+
+    try:
+        content = _read_trust_data(response, image, role, retry, max_length)
+    finally:
+        response.close()
 
-    if not token and response.status_code == 401:
+    if content is None:
+        case_insensitive_headers = {
+            k.lower(): response.headers[k] for k in response.headers
+        }
+        auth_url = parse_auth(case_insensitive_headers["www-authenticate"])
+        AUTH_URLS.set(repo_url, auth_url)
+
+        # the token may have been requested concurrently in the meantime,
+        # otherwise a new one is needed
+        new_token = TOKEN_CACHE.get(auth_url)
+        if not new_token or new_token == token:
+            new_token = get_auth_token(auth_url)
+        return get_trust_data(host, image, role, new_token, max_length)
+
+    data = json.loads(content)
+
+    return TrustData(data, role.role, raw=content)
+
+
+def _read_trust_data(
+    response: requests.Response, image: Image, role: TUFRole, retry: bool, max_length
+):
+    """
+    Reads the trust data from the streamed `response`. Returns `None`, should
+    the request need to be repeated with a new token.
+    """
+    if retry and response.status_code == 401:
         case_insensitive_headers = {
             k.lower(): response.headers[k] for k in response.headers
         }
 
         if case_insensitive_headers["www-authenticate"]:
-            auth_url = parse_auth(case_insensitive_headers["www-authenticate"])
-            token = get_auth_token(auth_url)
-            return get_trust_data(host, image, role, token)
+            return None
 
     if response.status_code == 404:
         raise NotFoundException(
@@ -92,16 +157,46 @@ def get_trust_data(host: str, image: Image, role: TUFRole, token: str = None):
 
     response.raise_for_status()
 
-    data = response.json()
+    limit = MAX_TRUST_DATA_SIZE
+    if max_length:
+        limit = min(limit, max_length)
+
+    content_length = response.headers.get("Content-Length")
+    if content_length and int(content_length) > limit:
+        raise ValidationError(
+            "trust data exceeds maximum size.",
+            {"tuf_role": role.role, "length": int(content_length), "limit": limit},
+        )
 
-    return TrustData(data, role.role)
+    chunks, length = [], 0
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        length += len(chunk)
+        if length > limit:
+            raise ValidationError(
+                "trust data exceeds maximum size.",
+                {"tuf_role": role.role, "length": length, "limit": limit},
+            )
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+def get_cached_auth_token(repo_url: str):
+    """
+    Returns the cached token for the repository with the given notary
+    `repo_url`, or `None` should there be none.
+    """
+    auth_url = AUTH_URLS.get(repo_url)
+    if auth_url is None:
+        return None
+    return TOKEN_CACHE.get(auth_url)
 
 
 def get_delegation_trust_data(
-    host: str, image: Image, role: TUFRole, token: str = None
+    host: str, image: Image, role: TUFRole, token: str = None, max_length: int = None
 ):
     try:
-        return get_trust_data(host, image, role, token)
+        return get_trust_data(host, image, role, token, max_length)
     except Exception as ex:
         if os.environ.get("LOG_LEVEL", "INFO") == "DEBUG":
             raise ex
@@ -163,7 +258,8 @@ def parse_auth(auth_header: str):
 def get_auth_token(url: str):
     """
     Return the JWT from the given `url`, using user and password from
-    environment variables.
+    environment variables. The token is cached in the `TOKEN_CACHE` until
+    shortly before it expires.
 
     Raises an exception if a HTTP error status code occurs.
     """
@@ -176,7 +272,7 @@ def get_auth_token(url: str):
     if is_notary_selfsigned():
         request_kwargs["verify"] = "/etc/certs/notary.crt"
 
-    response = requests.get(**request_kwargs)
+    response = get_session("notary").get(**request_kwargs)
 
     if response.status_code >= 500:
         raise NotFoundException(
@@ -202,4 +298,25 @@ def get_auth_token(url: str):
         raise InvalidFormatException(
             "authentication token has wrong format.", {"auth_url": url}
         )
+
+    lifetime = get_token_lifetime(token, response.json().get("expires_in"))
+    TOKEN_CACHE.set(url, token, ttl=lifetime - TOKEN_EXPIRY_LEEWAY)
     return token
+
+
+def get_token_lifetime(token: str, expires_in: int = None):
+    """
+    Returns the number of seconds the `token` stays valid. Prefers the
+    `expires_in` value of the auth server's response and falls back to the
+    token's `exp` claim, or the default lifetime of 60 seconds.
+    """
+    if expires_in is not None:
+        try:
+            return float(expires_in)
+        except (TypeError, ValueError):
+            pass
+
+    expiry = get_token_expiry(token)
+    if expiry is None:
+        return DEFAULT_TOKEN_LIFETIME
+    return expiry - time.time()
@@ -1,8 +1,12 @@
 import os
 import fnmatch
-import json
-from jsonschema import validate, ValidationError
+import logging
+import re
+import threading
+import time
+from jsonschema import ValidationError
 import connaisseur.kube_api as api
+from connaisseur.schema import validate
 from connaisseur.image import Image
 from connaisseur.exceptions import InvalidFormatException, NotFoundException
 
@@ -13,64 +17,239 @@ class ImagePolicy:
     an image.
 
     Accesses the policy from the kubernetes cluster via its API and validates
-    it.
+    it, unless an `image_policy` is given.
 
     Raises an `InvalidFormatException` should the policy not conform a defined
     schema.
     """
 
     policy: dict
+    matcher: "RuleMatcher"
     JSON_SCHEMA_PATH = "connaisseur/res/policy_schema.json"
 
-    def __init__(self):
+    def __init__(self, image_policy: dict = None):
         # load policy from k8s
-        image_policy = ImagePolicy.get_image_policy()
+        if image_policy is None:
+            image_policy = ImagePolicy.get_image_policy()
 
         # validate policy
-        with open(self.JSON_SCHEMA_PATH, "r") as schema_file:
-            schema = json.load(schema_file)
         try:
-            validate(instance=image_policy, schema=schema)
+            validate(image_policy, self.JSON_SCHEMA_PATH)
         except ValidationError as err:
             raise InvalidFormatException("invalid format for image policy.") from err
 
         self.policy = image_policy
+        self.matcher = RuleMatcher(image_policy["rules"])
 
     @staticmethod
     def get_image_policy():
         """
         Loads the image policy from the kubernetes API.
         """
-        image_policy = os.environ.get("CONNAISSEUR_IMAGE_POLICY")
-
-        path = f"apis/connaisseur.policy/v1/imagepolicies/{image_policy}"
-        response = api.request_kube_api(path)
+        response = api.request_kube_api(ImagePolicy.get_image_policy_path())
 
         return response["spec"]
 
+    @staticmethod
+    def get_image_policy_path():
+        """
+        Returns the kubernetes API path of the image policy.
+        """
+        image_policy = os.environ.get("CONNAISSEUR_IMAGE_POLICY")
+        return f"apis/connaisseur.policy/v1/imagepolicies/{image_policy}"
+
     def get_matching_rule(self, image: Image):
         """
         Returns for a given `image` the most specific matching rule.
         """
-        rules = [rule["pattern"] for rule in self.policy["rules"]]
-
-        best_match = Match("", "")
-        for rule in rules:
-            rule_with_tag = f"{rule}:*" if ":" not in rule else rule
-            if fnmatch.fnmatch(str(image), rule_with_tag):
-                match = Match(rule, str(image))
-                best_match = match.compare(best_match)
+        most_specific_rule = self.matcher.match(str(image))
 
-        if not best_match:
+        if most_specific_rule is None:
             raise NotFoundException(
                 'no matching rule for image "{}" could be found.'.format(str(image))
             )
 
-        most_specific_rule = next(
-            filter(lambda x: x["pattern"] == best_match.key, self.policy["rules"]), None
+        return most_specific_rule
+
+
+class RuleMatcher:
+    """
+    Index over the rules of an image policy, that finds the most specific
+    matching rule for an image, without checking each rule.
+
+    The rule patterns are stored in a trie, keyed on their leading path
+    components that don't contain any wildcards. Each pattern is precompiled
+    to a regex and kept at the node of its last literal component. Looking up
+    an image only walks down the image's path components and checks the
+    patterns found along the way.
+    """
+
+    def __init__(self, rules: list):
+        self._root = RuleMatcher._new_node()
+
+        for index, rule in enumerate(rules):
+            pattern = rule["pattern"]
+            pattern_with_tag = f"{pattern}:*" if ":" not in pattern else pattern
+
+            node = self._root
+            for component in pattern_with_tag.split("/"):
+                if RuleMatcher._is_wildcard(component):
+                    break
+                node = node["children"].setdefault(component, RuleMatcher._new_node())
+
+            regex = re.compile(fnmatch.translate(pattern_with_tag))
+            node["rules"].append((index, regex, rule))
+
+    @staticmethod
+    def _new_node():
+        return {"children": {}, "rules": []}
+
+    @staticmethod
+    def _is_wildcard(component: str):
+        return any(char in component for char in "*?[")
+
+    def match(self, image: str):
+        """
+        Returns the most specific rule matching the given `image`, or `None`
+        should no rule match.
+        """
+        node = self._root
+        candidates = list(node["rules"])
+        for component in image.split("/"):
+            node = node["children"].get(component)
+            if node is None:
+                break
+            candidates += node["rules"]
+
+        # compare the candidates in policy order, so that ties are resolved
+        # the same way as for a linear scan over all rules
+        best_match, best_rule = Match("", ""), None
+        for _, regex, rule in sorted(candidates, key=lambda x: x[0]):
+            if regex.match(image):
+                match = Match(rule["pattern"], image)
+                if match.compare(best_match) is match:
+                    best_match, best_rule = match, rule
+
+        return best_rule
+
+
+class ImagePolicyWatcher:
+    """
+    Keeps the validated `ImagePolicy` in memory, so it doesn't need to be
+    requested and validated for each admission request. Once started, a
+    background thread watches the image policy resource in the kubernetes
+    cluster and only replaces the `ImagePolicy`, should the resource version
+    of the policy change.
+
+    As long as the watcher isn't started or has no valid policy, the
+    `ImagePolicy` is loaded anew for each call of `get_policy`.
+    """
+
+    policy: ImagePolicy
+    resource_version: str
+    retry_interval: int = 5
+
+    def __init__(self):
+        self.policy = None
+        self.resource_version = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Loads the image policy and starts watching it for changes.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="image-policy-watcher", daemon=True
+            )
+        try:
+            self.refresh()
+        except Exception as err:  # pylint: disable=broad-except
+            logging.error("failed to load image policy: %s", err)
+        self._thread.start()
+
+    def get_policy(self):
+        """
+        Returns the current `ImagePolicy`.
+        """
+        policy = self.policy
+        if policy is None:
+            return ImagePolicy()
+        return policy
+
+    def refresh(self):
+        """
+        Requests the image policy from the kubernetes API and updates the
+        `ImagePolicy` with it.
+        """
+        self.update(api.request_kube_api(ImagePolicy.get_image_policy_path()))
+
+    def update(self, image_policy: dict):
+        """
+        Replaces the `ImagePolicy` with the given `image_policy` resource,
+        should its resource version differ from the current one. An invalid
+        policy is discarded, so that the next `get_policy` call raises.
+        """
+        resource_version = image_policy["metadata"]["resourceVersion"]
+        if resource_version == self.resource_version and self.policy is not None:
+            return
+
+        try:
+            self.policy = ImagePolicy(image_policy["spec"])
+        except InvalidFormatException as err:
+            logging.error("invalid image policy: %s", err)
+            self.policy = None
+        self.resource_version = resource_version
+
+    def handle_event(self, event: dict):
+        """
+        Processes a watch `event` of the image policy resource.
+        """
+        event_type, image_policy = event["type"], event["object"]
+        if event_type in ("ADDED", "MODIFIED"):
+            self.update(image_policy)
+        elif event_type == "DELETED":
+            self.policy = None
+            self.resource_version = image_policy["metadata"]["resourceVersion"]
+        elif event_type == "BOOKMARK":
+            self.resource_version = image_policy["metadata"]["resourceVersion"]
+        else:
+            # most likely the resource version is too old, so the watch has to
+            # start over again
+            raise NotFoundException(
+                "watching the image policy failed.", {"event": event}
+            )
+
+    def watch(self):
+        """
+        Watches the image policy for changes, until the kubernetes API closes
+        the connection.
+        """
+        if self.resource_version is None:
+            self.refresh()
+
+        image_policy = os.environ.get("CONNAISSEUR_IMAGE_POLICY")
+        path = (
+            "apis/connaisseur.policy/v1/imagepolicies"
+            f"?fieldSelector=metadata.name%3D{image_policy}"
         )
+        for event in api.watch_kube_api(path, self.resource_version):
+            self.handle_event(event)
 
-        return most_specific_rule
+    def _run(self):
+        while True:
+            try:
+                self.watch()
+            except Exception as err:  # pylint: disable=broad-except
+                logging.error("error while watching the image policy: %s", err)
+                self.resource_version = None
+                time.sleep(self.retry_interval)
+
+
+POLICY_WATCHER = ImagePolicyWatcher()
 
 
 class Match:
@@ -0,0 +1,87 @@
+import functools
+import json
+import logging
+import os
+from jsonschema import FormatChecker, ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+try:
+    import fastjsonschema
+except ImportError:  # pragma: no cover
+    fastjsonschema = None
+
+
+@functools.lru_cache(maxsize=None)
+def load_schema(path: str):
+    """
+    Loads the JSON schema from the given `path`. Each schema is only read
+    once per process, so the returned `dict` must not be modified.
+    """
+    with open(path, "r") as schema_file:
+        return json.load(schema_file)
+
+
+@functools.lru_cache(maxsize=None)
+def get_validator(path: str, check_formats: bool = False):
+    """
+    Returns a reusable validator for the JSON schema at the given `path`,
+    which is checked and compiled only once per process. Formats are only
+    validated when `check_formats` is set.
+
+    The validation backend can be set with the `SCHEMA_BACKEND` environment
+    variable, either to "jsonschema" (default) or "fastjsonschema", should it
+    be installed.
+    """
+    schema = load_schema(path)
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+
+    if os.environ.get("SCHEMA_BACKEND", "jsonschema") == "fastjsonschema":
+        if fastjsonschema is not None:
+            return FastValidator(schema)
+        logging.warning("fastjsonschema is not installed, using jsonschema instead.")
+
+    format_checker = FormatChecker() if check_formats else None
+    return JsonSchemaValidator(validator_class(schema, format_checker=format_checker))
+
+
+def validate(instance, path: str, check_formats: bool = False):
+    """
+    Validates the `instance` against the JSON schema at the given `path`.
+
+    Raises a `jsonschema.ValidationError` should the `instance` not conform
+    to the schema.
+    """
+    get_validator(path, check_formats).validate(instance)
+
+
+class JsonSchemaValidator:
+    """
+    Validates instances with a prebuilt `jsonschema` validator.
+    """
+
+    def __init__(self, validator):
+        self.validator = validator
+
+    def validate(self, instance):
+        # like `jsonschema.validate`, raise the most relevant error
+        error = best_match(self.validator.iter_errors(instance))
+        if error is not None:
+            raise error
+
+
+class FastValidator:
+    """
+    Validates instances with a validation function, that was compiled to
+    python code by `fastjsonschema`. Formats are always validated.
+    """
+
+    def __init__(self, schema: dict):
+        self.validate_func = fastjsonschema.compile(schema)
+
+    def validate(self, instance):
+        try:
+            self.validate_func(instance)
+        except fastjsonschema.JsonSchemaException as err:
+            raise ValidationError(str(err)) from err
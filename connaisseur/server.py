@@ -0,0 +1,71 @@
+import os
+from gunicorn.app.base import BaseApplication
+from connaisseur.alert import ALERT_AGGREGATOR, ALERT_DISPATCHER
+from connaisseur.policy import POLICY_WATCHER
+from connaisseur.workload_cache import WORKLOAD_CACHE
+
+
+def get_server_options():
+    """
+    Returns the options for the gunicorn server, configured via environment
+    variables.
+    """
+    return {
+        # the host needs to be set to `0.0.0.0` so it can be reachable from outside
+        # the container
+        "bind": "0.0.0.0:5000",  # nosec
+        "certfile": "/etc/certs/tls.crt",
+        "keyfile": "/etc/certs/tls.key",
+        "worker_class": "gthread",
+        "workers": int(os.environ.get("WEB_WORKERS", "2")),
+        "threads": int(os.environ.get("WEB_THREADS", "4")),
+        "keepalive": int(os.environ.get("WEB_KEEPALIVE", "5")),
+        "backlog": int(os.environ.get("WEB_BACKLOG", "2048")),
+        "timeout": int(os.environ.get("WEB_TIMEOUT", "60")),
+        "graceful_timeout": int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30")),
+        "max_requests": int(os.environ.get("WEB_MAX_REQUESTS", "1000")),
+        "max_requests_jitter": int(os.environ.get("WEB_MAX_REQUESTS_JITTER", "100")),
+        # the root file system is read-only, so the worker heartbeat files are kept
+        # in memory
+        "worker_tmp_dir": "/dev/shm",  # nosec
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+    }
+
+
+def post_worker_init(worker):  # pylint: disable=unused-argument
+    """
+    Starts watching the image policy and workloads in each worker, after it
+    was forked.
+    """
+    POLICY_WATCHER.start()
+    WORKLOAD_CACHE.start()
+
+
+def worker_exit(server, worker):  # pylint: disable=unused-argument
+    """
+    Sends the alerts, which are still aggregated or queued in the exiting
+    worker, for at most `ALERT_DRAIN_TIMEOUT` seconds.
+    """
+    ALERT_AGGREGATOR.flush(close_all=True)
+    ALERT_DISPATCHER.drain(float(os.environ.get("ALERT_DRAIN_TIMEOUT", "5")))
+
+
+class ConnaisseurApplication(BaseApplication):
+    """
+    Serves the flask `app` with gunicorn, using multiple worker processes with
+    several threads each.
+    """
+
+    def __init__(self, app, options: dict = None):
+        self.application = app
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        return self.application
@@ -0,0 +1,62 @@
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
+
+_SESSIONS = {}
+_LOCK = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    `HTTPAdapter` that applies a default `timeout` to all requests, which don't
+    define their own.
+    """
+
+    timeout: float
+
+    def __init__(self, timeout: float, *args, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def get_session(name: str):
+    """
+    Returns the shared `requests.Session` for the given `name` ("notary" or
+    "alert"), so that connections are kept alive and reused between requests.
+
+    The number of pooled connections per host and the default timeout in
+    seconds can be configured through the `<NAME>_POOL_SIZE` and
+    `<NAME>_TIMEOUT` environment variables.
+    """
+    with _LOCK:
+        session = _SESSIONS.get(name)
+        if session is None:
+            session = _SESSIONS[name] = create_session(name)
+    return session
+
+
+def create_session(name: str):
+    """
+    Creates a new `requests.Session`, configured for the given `name`.
+    """
+    prefix = name.upper()
+    pool_size = int(os.environ.get(f"{prefix}_POOL_SIZE", "10"))
+    timeout = float(os.environ.get(f"{prefix}_TIMEOUT", "10"))
+
+    adapter = TimeoutHTTPAdapter(
+        timeout, pool_connections=pool_size, pool_maxsize=pool_size
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # requests must not influence each other, so no cookies are kept
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
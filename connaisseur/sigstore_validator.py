@@ -1,8 +1,14 @@
+import contextlib
+import fcntl
 import json
 import logging
+import os
 import re
 import subprocess  # nosec
+import threading
+import time
 
+from connaisseur.cache import TTLCache
 from connaisseur.crypto import decode_and_verify_ecdsa_key
 from connaisseur.exceptions import (
     CosignError,
@@ -12,13 +18,98 @@ from connaisseur.exceptions import (
     UnexpectedCosignData,
 )
 
+# digests, which were validated by cosign, keyed by image reference and public key
+COSIGN_CACHE = TTLCache(
+    maxsize=int(os.environ.get("COSIGN_CACHE_SIZE", "512")),
+    ttl=float(os.environ.get("COSIGN_CACHE_TTL", "30")),
+)
+
+
+class CosignLimiter:
+    """
+    Limits the number of concurrently running cosign processes to `slots`
+    across all server worker processes of a pod. Each cosign process holds
+    the lock of one of the `slots` lock files in `lock_dir`, which all workers
+    share. Should all slots be taken, the lock files are polled until one is
+    released, for at most `timeout` seconds.
+    """
+
+    poll_interval: float = 0.05
+
+    def __init__(self, slots: int, lock_dir: str, timeout: float = 10):
+        self.slots = slots
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        # threads of the same worker wait here, instead of polling
+        self._semaphore = threading.BoundedSemaphore(slots)
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Waits for a free slot and holds it until the context is left.
+
+        Raises `CosignTimeout` should no slot become free within `timeout`
+        seconds.
+        """
+        deadline = time.monotonic() + self.timeout
+        if not self._semaphore.acquire(timeout=self.timeout):
+            raise CosignLimiter._timeout_error()
+        try:
+            lock_file = self._lock_slot(deadline)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+        finally:
+            self._semaphore.release()
+
+    def _lock_slot(self, deadline: float):
+        while True:
+            for slot in range(self.slots):
+                lock_file = open(  # pylint: disable=consider-using-with
+                    os.path.join(self.lock_dir, f"cosign-{slot}.lock"), "a"
+                )
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return lock_file
+                except BlockingIOError:
+                    lock_file.close()
+            if time.monotonic() >= deadline:
+                raise CosignLimiter._timeout_error()
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def _timeout_error():
+        return CosignTimeout(
+            "waiting for a free cosign slot timed out.",
+            {"trust_data_type": "dev.cosignproject.cosign/signature"},
+        )
+
+
+# limits the number of concurrently running cosign processes per pod. waiting
+# for a free slot gives up after the default timeout of admission webhooks, as
+# the kubernetes API wouldn't wait for the response any longer
+COSIGN_LIMITER = CosignLimiter(
+    slots=int(os.environ.get("COSIGN_MAX_CONCURRENCY", "4")),
+    lock_dir=os.environ.get("COSIGN_LOCK_DIR", "/dev/shm"),  # nosec
+    timeout=float(os.environ.get("COSIGN_WAIT_TIMEOUT", "10")),
+)
+
 
 def get_cosign_validated_digests(image: str, pubkey: str):
     """
     Gets and processes cosign validation output for a given `image` and `pubkey`
     and either returns a list of valid digests or raises a suitable exception
     in case no valid signature is found or cosign fails.
+
+    Validated digests are cached for `COSIGN_CACHE_TTL` seconds, so cosign
+    isn't invoked again for the same `image` and `pubkey` in the meantime.
     """
+    cached_digests = COSIGN_CACHE.get((image, pubkey))
+    if cached_digests is not None:
+        return list(cached_digests)
+
     returncode, stdout, stderr = invoke_cosign(image, pubkey)
     logging.info(
         "COSIGN output for image: %s; RETURNCODE: %s; STDOUT: %s; STDERR: %s",
@@ -70,6 +161,7 @@ def get_cosign_validated_digests(image: str, pubkey: str):
             "could not extract any digest from data received by cosign "
             "despite successful image verification."
         )
+    COSIGN_CACHE.set((image, pubkey), tuple(digests))
     return digests
 
 
@@ -77,13 +169,16 @@ def invoke_cosign(image, pubkey):
     """
     Invokes a cosign binary in a subprocess for a specific `image` given a `pubkey` and
     returns the returncode, stdout and stderr. Will raise an exception if cosign times out.
+
+    At most `COSIGN_MAX_CONCURRENCY` cosign processes run at the same time in
+    all workers of the pod, further invocations wait until one of them finished.
     """
 
     decode_and_verify_ecdsa_key(pubkey)  # raises if invalid; return value not used
     cmd = ["/app/cosign/cosign", "verify", "-key", "/dev/stdin", image]
     stdinput = f"-----BEGIN PUBLIC KEY-----\n{pubkey}\n-----END PUBLIC KEY-----"
 
-    with subprocess.Popen(  # nosec
+    with COSIGN_LIMITER.slot(), subprocess.Popen(  # nosec
         cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
     ) as process:
         try:
@@ -1,15 +1,24 @@
 import pytest
 from datetime import datetime, timedelta
 import json
+import os
 
+import connaisseur.alert
 from connaisseur.alert import (
     Alert,
+    AlertAggregator,
+    AlertConfigManager,
+    AlertDispatcher,
+    AlertTemplateCache,
+    TokenBucket,
     send_alerts,
     call_alerting_on_request,
     get_alert_config_validation_schema,
     load_config,
 )
 from connaisseur.exceptions import AlertSendingError, ConfigurationError
+from connaisseur.schema import load_schema, validate as validate_schema
+from jsonschema import ValidationError
 
 with open("tests/data/ad_request_deployments.json", "r") as readfile:
     admission_request_deployment = json.load(readfile)
@@ -123,11 +132,35 @@ def mock_env_vars(monkeypatch):
     )
 
 
+@pytest.fixture(autouse=True)
+def mock_alert_config(monkeypatch):
+    monkeypatch.setattr(connaisseur.alert, "ALERT_CONFIG", AlertConfigManager())
+    monkeypatch.setattr(connaisseur.alert, "ALERT_TEMPLATES", AlertTemplateCache())
+
+
+@pytest.fixture(autouse=True)
+def mock_token_buckets(monkeypatch):
+    monkeypatch.setattr(connaisseur.alert, "_BUCKETS", {})
+
+
+@pytest.fixture(autouse=True)
+def mock_alert_dispatcher(monkeypatch, mocker):
+    # no alerts are sent in the background during tests
+    dispatcher = mocker.MagicMock(spec=AlertDispatcher)
+    monkeypatch.setattr(connaisseur.alert, "ALERT_DISPATCHER", dispatcher)
+    monkeypatch.setattr(
+        connaisseur.alert,
+        "ALERT_AGGREGATOR",
+        AlertAggregator(dispatcher, flush_interval=0),
+    )
+    return dispatcher
+
+
 @pytest.fixture()
 def mock_alertconfig_validation_schema(mocker):
     mocker.patch(
-        "connaisseur.alert.get_alert_config_validation_schema",
-        return_value=alertconfig_schema,
+        "connaisseur.alert.ALERT_CONFIG_SCHEMA_PATH",
+        "tests/data/alerting/alertconfig_schema.json",
     )
 
 
@@ -421,8 +454,8 @@ def test_send_alerts(
     mock_alert.assert_has_calls(admit_calls, any_order=True)
     mocker.resetall()
     mocker.patch(
-        "connaisseur.alert.get_alert_config_validation_schema",
-        return_value=alertconfig_schema,
+        "connaisseur.alert.ALERT_CONFIG_SCHEMA_PATH",
+        "tests/data/alerting/alertconfig_schema.json",
     )
     mock_alert = mocker.patch("connaisseur.alert.Alert")
     send_alerts(admission_request, admitted=False, reason="Couldn't find trust data.")
@@ -516,7 +549,345 @@ def test_call_alerting_on_request(
 
 
 def test_get_alert_config_validation_schema(mocker, mock_env_vars):
+    load_schema.cache_clear()
     with open("tests/data/alerting/alertconfig_schema.json") as f:
         content = f.read()
     mocker.patch("builtins.open", mocker.mock_open(read_data=content))
     assert get_alert_config_validation_schema() == alertconfig_schema
+
+
+def test_alert_config_manager_cached(mock_alertconfig_validation_schema, mocker):
+    spy = mocker.spy(connaisseur.alert, "load_config")
+    manager = AlertConfigManager()
+    config = manager.get_config()
+    assert config["admit_request"]["templates"][0]["template"] == "opsgenie"
+    assert manager.get_config() is config
+    spy.assert_called_once()
+
+
+def test_alert_config_manager_reload(
+    mock_alertconfig_validation_schema, monkeypatch, tmpdir
+):
+    monkeypatch.setenv("ALERT_CONFIG_DIR", str(tmpdir))
+    manager = AlertConfigManager()
+    assert manager.get_config() == {}
+
+    with open("tests/data/alerting/alertconfig.json", "r") as readfile:
+        alert_config = json.load(readfile)
+    config_path = tmpdir.join("alertconfig.json")
+    config_path.write(json.dumps(alert_config))
+    assert manager.get_config() == alert_config
+
+    # kubernetes swaps the mounted file of an updated config map
+    alert_config.pop("admit_request")
+    new_config_path = tmpdir.join("alertconfig.json.new")
+    new_config_path.write(json.dumps(alert_config))
+    os.replace(str(new_config_path), str(config_path))
+    assert manager.get_config() == alert_config
+
+
+def test_alert_config_manager_invalid(mock_alertconfig_validation_schema, mocker):
+    mocker.patch.dict(
+        os.environ, {"ALERT_CONFIG_DIR": "tests/data/alerting/invalid_config"}
+    )
+    spy = mocker.spy(connaisseur.alert, "load_config")
+    manager = AlertConfigManager()
+    for _ in range(2):
+        with pytest.raises(ConfigurationError):
+            manager.get_config()
+    assert spy.call_count == 2
+
+
+def test_alert_template_cache(mocker):
+    spy = mocker.spy(connaisseur.alert.ALERT_TEMPLATES, "_compile")
+    first = Alert("first", custom_receiver_config, admission_request_deployment)
+    second = Alert("second", custom_receiver_config, admission_request_deployment)
+    assert json.loads(first.payload)[1] == {"test1": ["first", "minikube"]}
+    assert json.loads(second.payload)[1] == {"test1": ["second", "minikube"]}
+    # the template file is compiled once, one call per node of the template
+    assert spy.call_count == 9
+
+
+def test_alert_template_cache_reload(monkeypatch, tmpdir):
+    monkeypatch.setenv("ALERT_CONFIG_DIR", str(tmpdir))
+    templates_dir = tmpdir.mkdir("templates")
+    template_path = templates_dir.join("custom.json")
+    template_path.write(json.dumps({"message": "{{ alert_message }}"}))
+
+    cache = AlertTemplateCache()
+    template = cache.get_template("custom")
+    assert template["message"].render(alert_message="hai") == "hai"
+    assert cache.get_template("custom") is template
+
+    new_template_path = templates_dir.join("custom.json.new")
+    new_template_path.write(json.dumps({"text": "{{ alert_message }}!"}))
+    os.replace(str(new_template_path), str(template_path))
+    assert cache.get_template("custom")["text"].render(alert_message="hai") == "hai!"
+
+
+def test_send_alerts_dispatched(
+    mock_alertconfig_validation_schema, mock_alert_dispatcher, mocker
+):
+    mock_send_alert = mocker.patch("connaisseur.alert.Alert.send_alert")
+    send_alerts(admission_request_deployment, admitted=True)
+
+    # opsgenie must receive the alert for the request to be admitted
+    mock_send_alert.assert_called_once()
+    mock_alert_dispatcher.dispatch.assert_called_once()
+    assert mock_alert_dispatcher.dispatch.call_args[0][0].template == "slack"
+
+
+dispatched_receiver_config = dict(
+    custom_receiver_config, receiver_url="https://alerts.receiver.test"
+)
+
+
+@pytest.fixture
+def mock_sleep(mocker):
+    return mocker.patch("connaisseur.alert.time.sleep")
+
+
+def test_alert_dispatcher_send(requests_mock, mock_sleep):
+    requests_mock.post(
+        "https://alerts.receiver.test",
+        [{"status_code": 500}, {"status_code": 503}, {"status_code": 200}],
+    )
+    dispatcher = AlertDispatcher(workers=0, retries=3, backoff=0.5)
+    alert = Alert("message", dispatched_receiver_config, admission_request_deployment)
+    assert dispatcher.send(alert) is True
+    assert requests_mock.call_count == 3
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.5, 1.0]
+    assert dispatcher.counters == {
+        "sent": 1,
+        "failed": 0,
+        "dropped": 0,
+        "rate_limited": 0,
+    }
+
+
+def test_alert_dispatcher_send_failed(requests_mock, mock_sleep, mocker):
+    mock_error_log = mocker.patch("logging.error")
+    requests_mock.post("https://alerts.receiver.test", status_code=500)
+    dispatcher = AlertDispatcher(workers=0, retries=2)
+    alert = Alert("message", dispatched_receiver_config, admission_request_deployment)
+    assert dispatcher.send(alert) is False
+    assert requests_mock.call_count == 3
+    assert mock_error_log.called is True
+    assert dispatcher.counters == {
+        "sent": 0,
+        "failed": 1,
+        "dropped": 0,
+        "rate_limited": 0,
+    }
+
+
+def test_alert_dispatcher_dropped(mocker):
+    mock_error_log = mocker.patch("logging.error")
+    dispatcher = AlertDispatcher(workers=0, queue_size=1)
+    alert = Alert("message", dispatched_receiver_config, admission_request_deployment)
+    dispatcher.dispatch(alert)
+    dispatcher.dispatch(alert)
+    assert dispatcher.queue.qsize() == 1
+    assert dispatcher.counters["dropped"] == 1
+    mock_error_log.assert_called_once()
+
+
+def test_alert_dispatcher_workers(requests_mock, mock_sleep):
+    requests_mock.post("https://alerts.receiver.test", status_code=200)
+    dispatcher = AlertDispatcher(workers=2)
+    alert = Alert("message", dispatched_receiver_config, admission_request_deployment)
+    for _ in range(4):
+        dispatcher.dispatch(alert)
+    dispatcher.queue.join()
+    assert dispatcher.counters["sent"] == 4
+    assert len(dispatcher._threads) == 2
+
+
+def test_alert_dispatcher_drain(requests_mock, mock_sleep):
+    requests_mock.post("https://alerts.receiver.test", status_code=200)
+    dispatcher = AlertDispatcher(workers=1)
+    alert = Alert("message", dispatched_receiver_config, admission_request_deployment)
+    assert dispatcher.drain(1) is True
+    for _ in range(3):
+        dispatcher.dispatch(alert)
+    assert dispatcher.drain(5) is True
+    assert dispatcher.counters["sent"] == 3
+
+
+def test_alert_dispatcher_drain_logs_counters(mocker):
+    mock_info_log = mocker.patch("logging.info")
+    dispatcher = AlertDispatcher(workers=0)
+    dispatcher.counters.update(sent=3, dropped=1)
+    assert dispatcher.drain(1) is True
+    mock_info_log.assert_called_once()
+    message, counters = mock_info_log.call_args[0]
+    assert message % counters == (
+        "alerts sent: 3, failed: 0, dropped: 1, rate limited: 0"
+    )
+
+
+def test_alert_dispatcher_drain_timeout():
+    dispatcher = AlertDispatcher(workers=0)
+    alert = Alert("message", dispatched_receiver_config, admission_request_deployment)
+    dispatcher.dispatch(alert)
+    assert dispatcher.drain(0.01) is False
+    assert dispatcher.queue.qsize() == 1
+
+
+@pytest.fixture
+def mock_monotonic(mocker):
+    class MockTime:
+        now: float = 1000.0
+
+        def monotonic(self):
+            return self.now
+
+    mock = MockTime()
+    mocker.patch("connaisseur.alert.time.monotonic", mock.monotonic)
+    return mock
+
+
+def test_token_bucket(mock_monotonic):
+    bucket = TokenBucket(rate=0.5, burst=2)
+    assert [bucket.consume() for _ in range(3)] == [True, True, False]
+    mock_monotonic.now += 1
+    assert bucket.consume() is False
+    mock_monotonic.now += 1
+    assert bucket.consume() is True
+    mock_monotonic.now += 60
+    assert [bucket.consume() for _ in range(3)] == [True, True, False]
+
+
+def test_token_bucket_unlimited():
+    bucket = TokenBucket()
+    assert all(bucket.consume() for _ in range(100))
+
+
+def test_alert_dispatcher_rate_limited(mock_monotonic, mocker):
+    mocker.patch("logging.warning")
+    dispatcher = AlertDispatcher(workers=0)
+    alert = Alert("message", dispatched_receiver_config, admission_request_deployment)
+    for _ in range(3):
+        dispatcher.dispatch(alert, {"rate": 1})
+    assert dispatcher.queue.qsize() == 1
+    assert dispatcher.counters["rate_limited"] == 2
+
+    # other receivers aren't limited
+    other_alert = Alert("message", custom_receiver_config, admission_request_deployment)
+    dispatcher.dispatch(other_alert)
+    assert dispatcher.queue.qsize() == 2
+
+    # buckets are shared between dispatchers
+    other_dispatcher = AlertDispatcher(workers=0)
+    other_dispatcher.dispatch(alert, {"rate": 1})
+    assert other_dispatcher.counters["rate_limited"] == 1
+
+
+aggregated_receiver_config = dict(dispatched_receiver_config, aggregation_window=30)
+
+
+def test_alert_aggregator(mock_monotonic, mock_alert_dispatcher):
+    aggregator = AlertAggregator(mock_alert_dispatcher, flush_interval=0)
+    args = (aggregated_receiver_config, "reject_request", "rejected")
+    assert aggregator.add(*args, admission_request_deployment) is False
+    assert aggregator.add(*args, admission_request_deployment) is True
+    assert aggregator.add(*args, admission_request_deployment) is True
+
+    # other images or events are aggregated separately
+    assert aggregator.add(*args, admission_request_allowlisted) is False
+    assert (
+        aggregator.add(
+            aggregated_receiver_config,
+            "admit_request",
+            "admitted",
+            admission_request_deployment,
+        )
+        is False
+    )
+
+    aggregator.flush()
+    mock_alert_dispatcher.dispatch.assert_not_called()
+
+    mock_monotonic.now += 30
+    aggregator.flush()
+    mock_alert_dispatcher.dispatch.assert_called_once()
+    alert = mock_alert_dispatcher.dispatch.call_args[0][0]
+    assert json.loads(alert.payload)[1]["test1"][0] == (
+        "rejected (and 2 similar alerts within 30 seconds)"
+    )
+    assert aggregator.windows == {}
+
+
+def test_alert_aggregator_new_window(mock_monotonic, mock_alert_dispatcher):
+    aggregator = AlertAggregator(mock_alert_dispatcher, flush_interval=0)
+    args = (aggregated_receiver_config, "reject_request", "rejected")
+    aggregator.add(*args, admission_request_deployment)
+    aggregator.add(*args, admission_request_deployment)
+
+    # the summary of a closed window is sent, before the next window opens
+    mock_monotonic.now += 31
+    assert aggregator.add(*args, admission_request_deployment) is False
+    mock_alert_dispatcher.dispatch.assert_called_once()
+    assert len(aggregator.windows) == 1
+
+
+def test_alert_aggregator_flush_all(mock_monotonic, mock_alert_dispatcher):
+    aggregator = AlertAggregator(mock_alert_dispatcher, flush_interval=0)
+    receiver = dict(aggregated_receiver_config, rate_limit={"rate": 1})
+    args = (receiver, "reject_request", "rejected", admission_request_deployment)
+    aggregator.add(*args)
+    aggregator.add(*args)
+
+    # open windows are sent as well, e.g. before the worker exits
+    aggregator.flush(close_all=True)
+    mock_alert_dispatcher.dispatch.assert_called_once()
+    assert mock_alert_dispatcher.dispatch.call_args[0][1] == {"rate": 1}
+    assert aggregator.windows == {}
+
+
+def test_alert_aggregator_disabled(mock_alert_dispatcher):
+    aggregator = AlertAggregator(mock_alert_dispatcher, flush_interval=0)
+    for _ in range(2):
+        assert (
+            aggregator.add(
+                dispatched_receiver_config,
+                "reject_request",
+                "rejected",
+                admission_request_deployment,
+            )
+            is False
+        )
+    assert aggregator.windows == {}
+
+
+def test_send_alerts_aggregated(
+    mock_alertconfig_validation_schema, mock_alert_dispatcher, mocker, monkeypatch
+):
+    mocker.patch("connaisseur.alert.Alert.send_alert")
+    alert_config = connaisseur.alert.load_config()
+    alert_config["admit_request"]["templates"][1]["aggregation_window"] = 30
+    monkeypatch.setattr(
+        connaisseur.alert.ALERT_CONFIG, "get_config", lambda: alert_config
+    )
+    for _ in range(3):
+        send_alerts(admission_request_deployment, admitted=True)
+    mock_alert_dispatcher.dispatch.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "receiver_config, valid",
+    [
+        (dict(aggregated_receiver_config, rate_limit={"rate": 0.5, "burst": 5}), True),
+        (dict(aggregated_receiver_config, aggregation_window=-1), False),
+        (dict(aggregated_receiver_config, rate_limit={"rate": 0}), False),
+        (dict(aggregated_receiver_config, rate_limit={"burst": 5}), False),
+    ],
+)
+def test_alert_config_schema_receiver_limits(receiver_config: dict, valid: bool):
+    config = {"reject_request": {"templates": [receiver_config]}}
+    try:
+        validate_schema(config, "res/alertconfig_schema.json")
+    except ValidationError:
+        assert not valid
+    else:
+        assert valid
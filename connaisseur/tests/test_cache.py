@@ -0,0 +1,178 @@
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import connaisseur.cache
+from connaisseur.exceptions import BaseConnaisseurException
+
+
+@pytest.fixture
+def mock_time(monkeypatch):
+    class MockTime:
+        now: float = 1000.0
+
+        def monotonic(self):
+            return self.now
+
+    mock = MockTime()
+    monkeypatch.setattr(connaisseur.cache, "time", mock)
+    return mock
+
+
+def test_get_set():
+    cache = connaisseur.cache.TTLCache(maxsize=2)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    assert cache.get("other") is None
+    assert cache.get("other", "default") == "default"
+    assert len(cache) == 1
+
+
+def test_ttl(mock_time):
+    cache = connaisseur.cache.TTLCache(maxsize=3, ttl=10)
+    cache.set("key", "value")
+    cache.set("short", "value", ttl=2)
+    cache.set("long", "value", ttl=100)
+    mock_time.now += 5
+    assert cache.get("short") is None
+    assert cache.get("key") == "value"
+    mock_time.now += 5
+    assert cache.get("key") is None
+    assert cache.get("long") is None
+
+
+@pytest.mark.parametrize(
+    "maxsize, cache_ttl, ttl", [(0, None, None), (2, 0, None), (2, 10, -5)]
+)
+def test_set_disabled(maxsize: int, cache_ttl: float, ttl: float):
+    cache = connaisseur.cache.TTLCache(maxsize=maxsize, ttl=cache_ttl)
+    cache.set("key", "value", ttl=ttl)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    cache = connaisseur.cache.TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_pop_clear():
+    cache = connaisseur.cache.TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "gone") == "gone"
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.fixture
+def waiting_calls(monkeypatch):
+    waiting = []
+
+    class WaitingEvent(threading.Event):
+        def wait(self, timeout=None):
+            waiting.append(threading.current_thread().name)
+            return super().wait(timeout)
+
+    class WaitingCall(connaisseur.cache._Call):
+        def __init__(self):
+            super().__init__()
+            self.done = WaitingEvent()
+
+    monkeypatch.setattr(connaisseur.cache, "_Call", WaitingCall)
+    return waiting
+
+
+def wait_for(condition: callable):
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not met.")
+
+
+def test_single_flight_coalesces(waiting_calls):
+    single_flight = connaisseur.cache.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def func(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(single_flight.do, "key", func, "first")
+        started.wait(5)
+        followers = [
+            executor.submit(single_flight.do, "key", func, "other") for _ in range(3)
+        ]
+        wait_for(lambda: len(waiting_calls) == 3)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert calls == ["first"]
+    assert results == ["first"] * 4
+    assert len(single_flight) == 0
+
+
+def test_single_flight_error(waiting_calls):
+    single_flight = connaisseur.cache.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    errors = []
+
+    def func():
+        started.set()
+        release.wait(5)
+        errors.append(BaseConnaisseurException("failed.", {"key": "value"}))
+        raise errors[0]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, "key", func)
+        started.wait(5)
+        follower = executor.submit(single_flight.do, "key", func)
+        wait_for(lambda: len(waiting_calls) == 1)
+        release.set()
+        leader_error, follower_error = leader.exception(), follower.exception()
+
+    assert isinstance(leader_error, BaseConnaisseurException)
+    assert isinstance(follower_error, BaseConnaisseurException)
+    # neither caller gets the shared original error
+    assert len({id(errors[0]), id(leader_error), id(follower_error)}) == 3
+    assert leader_error.context == {"key": "value"}
+    assert follower_error.message == "failed."
+    assert follower_error.context == {"key": "value"}
+
+
+def test_single_flight_error_chain():
+    single_flight = connaisseur.cache.SingleFlight()
+
+    def func():
+        try:
+            {}["key"]
+        except KeyError as err:
+            raise BaseConnaisseurException("failed.") from err
+
+    with pytest.raises(BaseConnaisseurException) as err:
+        single_flight.do("key", func)
+    assert isinstance(err.value.__cause__, KeyError)
+    assert isinstance(err.value.__context__, KeyError)
+    assert "func" in "".join(traceback.format_tb(err.value.__traceback__))
+
+
+def test_single_flight_sequential():
+    single_flight = connaisseur.cache.SingleFlight()
+    calls = []
+    assert single_flight.do("key", lambda: calls.append(1) or len(calls)) == 1
+    assert single_flight.do("key", lambda: calls.append(1) or len(calls)) == 2
+    assert len(single_flight) == 0
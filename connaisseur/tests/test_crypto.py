@@ -1,6 +1,12 @@
+import base64
+import glob
+import os
 import pytest
 import json
+import ecdsa
+from cryptography.hazmat.primitives.asymmetric import ec
 import connaisseur.crypto
+from connaisseur.cache import TTLCache
 from connaisseur.exceptions import InvalidPublicKey
 
 root_pub = (
@@ -71,3 +77,113 @@ def test_decode_and_verify_ecdsa_key(base64encoded_key):
 def test_decode_and_verify_ecdsa_key_invalid_key_error(base64encoded_key):
     with pytest.raises(InvalidPublicKey):
         connaisseur.crypto.decode_and_verify_ecdsa_key(base64encoded_key)
+
+
+@pytest.mark.parametrize("backend", ["ecdsa", "cryptography"])
+def test_decode_and_verify_ecdsa_key_cached(crypto, monkeypatch, mocker, backend):
+    monkeypatch.setenv("CRYPTO_BACKEND", backend)
+    crypto.load_ecdsa_key.cache_clear()
+    crypto.load_cryptography_key.cache_clear()
+    mock_b64decode = mocker.spy(crypto.base64, "b64decode")
+    key = crypto.decode_and_verify_ecdsa_key(targets_pub)
+    assert crypto.decode_and_verify_ecdsa_key(targets_pub) is key
+    assert mock_b64decode.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "backend, key_class",
+    [
+        ("ecdsa", ecdsa.VerifyingKey),
+        ("cryptography", ec.EllipticCurvePublicKey),
+    ],
+)
+def test_get_backend(crypto, monkeypatch, backend: str, key_class: type):
+    monkeypatch.setenv("CRYPTO_BACKEND", backend)
+    assert crypto.get_backend().name == backend
+    assert isinstance(crypto.decode_and_verify_ecdsa_key(targets_pub), key_class)
+
+
+def test_get_backend_default(crypto, monkeypatch):
+    monkeypatch.delenv("CRYPTO_BACKEND", raising=False)
+    assert crypto.get_backend() is crypto.CRYPTOGRAPHY_BACKEND
+    monkeypatch.setattr(crypto, "ec", None)
+    assert crypto.get_backend() is crypto.ECDSA_BACKEND
+
+
+def get_signed_trust_data():
+    """
+    Returns the public key, signature and message of all signatures in the
+    test trust data, whose keys are known.
+    """
+    signed_trust_data = []
+    for root_path in sorted(glob.glob("tests/data/*/root.json")):
+        directory = os.path.dirname(root_path)
+        with open(root_path, "r") as file:
+            keys = json.load(file)["signed"]["keys"]
+        with open(f"{directory}/targets.json", "r") as file:
+            keys.update(json.load(file)["signed"]["delegations"]["keys"])
+
+        paths = glob.glob(f"{directory}/*.json") + glob.glob(f"{directory}/*/*.json")
+        for path in sorted(paths):
+            with open(path, "r") as file:
+                data = json.load(file)
+            message = json.dumps(data["signed"], separators=(",", ":"))
+            for signature in data["signatures"]:
+                key = keys.get(signature["keyid"])
+                if key and key["keytype"] == "ecdsa":
+                    signed_trust_data.append(
+                        (key["keyval"]["public"], signature["sig"], message)
+                    )
+    return signed_trust_data
+
+
+signed_trust_data = get_signed_trust_data()
+
+
+@pytest.mark.parametrize("public, signature, message", signed_trust_data)
+def test_backends_equivalent(crypto, public: str, signature: str, message: str):
+    for backend in (crypto.ECDSA_BACKEND, crypto.CRYPTOGRAPHY_BACKEND):
+        key = crypto.decode_and_verify_ecdsa_key(public, backend)
+        sig = base64.b64decode(signature)
+        assert backend.verify(key, sig, message.encode()) is True
+        with pytest.raises(Exception):
+            backend.verify(key, sig, message.encode() + b" ")
+        with pytest.raises(Exception):
+            backend.verify(key, sig[:-1] + bytes([sig[-1] ^ 1]), message.encode())
+        with pytest.raises(Exception):
+            backend.verify(key, sig[:-1], message.encode())
+
+
+def test_signed_trust_data():
+    # make sure the equivalence test doesn't silently run on no data
+    assert len(signed_trust_data) > 20
+
+
+@pytest.mark.parametrize("backend", ["ecdsa", "cryptography"])
+def test_verify_signature_cached(crypto, monkeypatch, mocker, backend):
+    monkeypatch.setenv("CRYPTO_BACKEND", backend)
+    monkeypatch.setattr(crypto, "VERIFICATION_CACHE", TTLCache(maxsize=8))
+    mock_verify = mocker.spy(crypto.get_backend(), "verify")
+    message = get_message("tests/data/sample_targets.json")
+
+    assert crypto.verify_signature(targets_pub, targets_sig, message)
+    assert crypto.verify_signature(targets_pub, targets_sig, message)
+    assert mock_verify.call_count == 1
+
+    # a different message, signature or key is verified again
+    with pytest.raises(Exception):
+        crypto.verify_signature(targets_pub, targets_sig, message + " ")
+    with pytest.raises(Exception):
+        crypto.verify_signature(targets_pub, root_sig, message)
+    with pytest.raises(Exception):
+        crypto.verify_signature(root_pub, targets_sig, message)
+    assert mock_verify.call_count == 4
+
+
+def test_verify_signature_failure_not_cached(crypto, monkeypatch, mocker):
+    monkeypatch.setattr(crypto, "VERIFICATION_CACHE", TTLCache(maxsize=8))
+    message = get_message("tests/data/sample_targets.json")
+    for _ in range(2):
+        with pytest.raises(Exception):
+            crypto.verify_signature(targets_pub, root_sig, message)
+    assert len(crypto.VERIFICATION_CACHE) == 0
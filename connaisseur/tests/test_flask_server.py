@@ -12,15 +12,12 @@ from connaisseur.exceptions import AlertSendingError, ConfigurationError
 from connaisseur.exceptions import NotFoundException
 from connaisseur.image import Image
 
-with open("tests/data/alerting/alertconfig_schema.json", "r") as readfile:
-    alertconfig_schema = json.load(readfile)
-
 
 @pytest.fixture(autouse=True)
 def mock_alertconfig_schema(mocker):
     mocker.patch(
-        "connaisseur.alert.get_alert_config_validation_schema",
-        return_value=alertconfig_schema,
+        "connaisseur.alert.ALERT_CONFIG_SCHEMA_PATH",
+        "tests/data/alerting/alertconfig_schema.json",
     )
 
 
@@ -50,6 +47,7 @@ def mock_notary_health(monkeypatch):
 def mock_policy_no_verify(monkeypatch):
     def m__init__(self):
         self.policy = {"rules": [{"pattern": "*:*", "verify": False}]}
+        self.matcher = policy.RuleMatcher(self.policy["rules"])
 
     monkeypatch.setattr(policy.ImagePolicy, "__init__", m__init__)
 
@@ -58,6 +56,7 @@ def mock_policy_no_verify(monkeypatch):
 def mock_policy_verify(monkeypatch):
     def m__init__(self):
         self.policy = {"rules": [{"pattern": "*:*", "verify": True}]}
+        self.matcher = policy.RuleMatcher(self.policy["rules"])
 
     monkeypatch.setattr(policy.ImagePolicy, "__init__", m__init__)
 
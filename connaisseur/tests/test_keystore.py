@@ -87,12 +87,13 @@ def mock_trust_data(monkeypatch):
     def validate_expiry(self):
         pass
 
-    def trust_init(self, data: dict, role: str):
+    def trust_init(self, data: dict, role: str, raw: bytes = None):
         self.schema_path = "res/targets_schema.json"
         self.kind = role
         self._validate_schema(data)
         self.signed = data["signed"]
         self.signatures = data["signatures"]
+        self.raw = raw
 
     monkeypatch.setattr(TrustData, "validate_expiry", validate_expiry)
     monkeypatch.setattr(TargetsData, "__init__", trust_init)
@@ -1,3 +1,4 @@
+import base64
 import os
 import pytest
 import requests
@@ -10,6 +11,17 @@ def api():
     return connaisseur.kube_api
 
 
+@pytest.fixture(autouse=True)
+def kube_client(monkeypatch, tmpdir):
+    token_path = tmpdir.join("token")
+    token_path.write("file-token")
+    monkeypatch.setenv("KUBE_API_TOKEN_PATH", str(token_path))
+    monkeypatch.setenv("KUBE_API_CA_PATH", "/ca.crt")
+    client = connaisseur.kube_api.KubeClient(check_interval=0)
+    monkeypatch.setattr(connaisseur.kube_api, "KUBE_CLIENT", client)
+    return client
+
+
 @pytest.fixture
 def mock_request(monkeypatch):
     class MockResponse:
@@ -33,7 +45,7 @@ def mock_request(monkeypatch):
 
         return MockResponse(file_content)
 
-    monkeypatch.setattr(requests, "get", mock_get_request)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(mock_get_request))
 
 
 @pytest.fixture
@@ -63,3 +75,82 @@ def test_request_kube_api(
     monkeypatch.setenv("KUBERNETES_SERVICE_HOST", "127.0.0.1")
     monkeypatch.setenv("KUBERNETES_SERVICE_PORT", "1234")
     assert api.request_kube_api(path) == response
+
+
+def test_watch_kube_api(api, mock_get_token, monkeypatch):
+    class MockStreamResponse:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            return [
+                b'{"type": "ADDED", "object": {"metadata": {"resourceVersion": "1"}}}',
+                b"",
+                b'{"type": "DELETED", "object": {"metadata": {"resourceVersion": "2"}}}',
+            ]
+
+    requests_kwargs = {}
+
+    def mock_get_request(url: str, **kwargs):
+        requests_kwargs.update(kwargs, url=url)
+        return MockStreamResponse()
+
+    monkeypatch.setattr(requests.Session, "get", staticmethod(mock_get_request))
+    monkeypatch.setenv("KUBERNETES_SERVICE_HOST", "127.0.0.1")
+    monkeypatch.setenv("KUBERNETES_SERVICE_PORT", "1234")
+    events = list(api.watch_kube_api("apis/v1/pods", "42", timeout=10))
+    assert [event["type"] for event in events] == ["ADDED", "DELETED"]
+    assert requests_kwargs["url"] == "https://127.0.0.1:1234/apis/v1/pods"
+    assert requests_kwargs["stream"] is True
+    assert requests_kwargs["headers"] == {"Authorization": "Bearer token"}
+    assert requests_kwargs["params"]["watch"] == "1"
+    assert requests_kwargs["params"]["resourceVersion"] == "42"
+    assert requests_kwargs["params"]["timeoutSeconds"] == "10"
+
+
+def make_jwt(expiry: float):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": expiry}).encode())
+    return f"header.{payload.decode().rstrip('=')}.signature"
+
+
+def test_kube_client_session(kube_client):
+    session = kube_client.get_session()
+    assert kube_client.get_session() is session
+    assert session.verify == "/ca.crt"
+
+
+def test_kube_client_get_token_cached(api, kube_client, mocker):
+    spy = mocker.spy(api, "get_token")
+    kube_client.check_interval = 60
+    assert kube_client.get_token() == "file-token"
+    assert kube_client.get_token() == "file-token"
+    assert spy.call_count == 1
+
+
+def test_kube_client_get_token_file_changed(api, kube_client, mocker, tmpdir):
+    spy = mocker.spy(api, "get_token")
+    assert kube_client.get_token() == "file-token"
+    assert kube_client.get_token() == "file-token"
+    assert spy.call_count == 1
+
+    tmpdir.join("token").write("rotated-token")
+    assert kube_client.get_token() == "rotated-token"
+    assert spy.call_count == 2
+
+
+@pytest.mark.parametrize("expiry, reads", [(-3600, 2), (30, 2), (3600, 1)])
+def test_kube_client_get_token_expiry(
+    api, kube_client, mocker, tmpdir, expiry: int, reads: int
+):
+    tmpdir.join("token").write(make_jwt(api.time.time() + expiry))
+    spy = mocker.spy(api, "get_token")
+    kube_client.check_interval = 60
+    kube_client.get_token()
+    kube_client.get_token()
+    assert spy.call_count == reads
@@ -1,8 +1,10 @@
 import pytest
+import base64
 import json
 import re
 import requests
 import connaisseur.notary_api
+import connaisseur.policy
 import connaisseur.trust_data
 import connaisseur.mutate as muta
 from connaisseur.exceptions import BaseConnaisseurException, UnknownVersionError
@@ -497,17 +499,25 @@ def mock_kube_request(monkeypatch):
 @pytest.fixture
 def mock_request(monkeypatch):
     class MockResponse:
-        content: dict
+        content: bytes
+        headers: dict = {}
         status_code: int = 200
 
         def __init__(self, content: dict):
-            self.content = content
+            self.content = json.dumps(content, separators=(",", ":")).encode()
 
         def raise_for_status(self):
             pass
 
         def json(self):
-            return self.content
+            return json.loads(self.content)
+
+        def iter_content(self, chunk_size: int = 1):
+            for i in range(0, len(self.content), chunk_size):
+                yield self.content[i : i + chunk_size]
+
+        def close(self):
+            pass
 
     def mock_get_request(**kwargs):
         regex = (
@@ -533,7 +543,7 @@ def mock_request(monkeypatch):
 
         return MockResponse(file_content)
 
-    monkeypatch.setattr(requests, "get", mock_get_request)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(mock_get_request))
 
 
 @pytest.fixture
@@ -555,8 +565,8 @@ def mock_policy(monkeypatch):
     def get_policy():
         return policy
 
-    muta.ImagePolicy.get_image_policy = staticmethod(get_policy)
-    muta.ImagePolicy.JSON_SCHEMA_PATH = "res/policy_schema.json"
+    connaisseur.policy.ImagePolicy.get_image_policy = staticmethod(get_policy)
+    connaisseur.policy.ImagePolicy.JSON_SCHEMA_PATH = "res/policy_schema.json"
 
 
 @pytest.fixture
@@ -564,12 +574,13 @@ def mock_trust_data(monkeypatch):
     def validate_expiry(self):
         pass
 
-    def trust_init(self, data: dict, role: str):
+    def trust_init(self, data: dict, role: str, raw: bytes = None):
         self.schema_path = "res/targets_schema.json"
         self.kind = role
         self._validate_schema(data)
         self.signed = data["signed"]
         self.signatures = data["signatures"]
+        self.raw = raw
 
     monkeypatch.setattr(
         connaisseur.trust_data.TrustData, "validate_expiry", validate_expiry
@@ -661,6 +672,28 @@ def test_get_parent_images(
     assert mutate.get_parent_images(ad_request, index, "namespace") == acc_images
 
 
+def test_get_parent_images_cached(mutate, monkeypatch):
+    def m_request(path: str):
+        raise AssertionError("parent object shouldn't be requested.")
+
+    monkeypatch.setattr(muta, "request_kube_api", m_request)
+    monkeypatch.setattr(
+        muta.WORKLOAD_CACHE,
+        "images",
+        {
+            "Deployment": {
+                (
+                    "namespace",
+                    "charlie-deployment",
+                    "3a3a7b38-5512-4a85-94bb-3562269e0a6a",
+                ): ["cached-image"]
+            }
+        },
+    )
+    ad_request = get_ad_request("tests/data/ad_request_replicasets.json")
+    assert muta.get_parent_images(ad_request, 0, "namespace") == ["cached-image"]
+
+
 def test_get_parent_images_error(mutate, mock_kube_request):
     with pytest.raises(BaseConnaisseurException) as err:
         ad_request = get_ad_request("tests/data/ad_request_pods.json")
@@ -722,3 +755,111 @@ def test_validate_error_kind(mutate):
     with pytest.raises(BaseConnaisseurException) as err:
         mutate.validate(ad_request)
     assert "unknown request object kind MisterX" in str(err.value)
+
+
+@pytest.fixture
+def mock_get_trusted_digest(monkeypatch):
+    verified_images = []
+
+    def m_get_trusted_digest(host: str, image, policy_rule: dict):
+        verified_images.append(str(image))
+        if image.name == "unsigned":
+            raise BaseConnaisseurException("no trust data.")
+        return "1" * 64
+
+    monkeypatch.setattr(muta, "get_trusted_digest", m_get_trusted_digest)
+    return verified_images
+
+
+def get_pod_request(images: list):
+    ad_request = get_ad_request("tests/data/ad_request_pods.json")
+    request_object = ad_request["request"]["object"]
+    request_object["metadata"].pop("ownerReferences", None)
+    request_object["spec"]["containers"] = [
+        {"name": f"container-{index}", "image": image}
+        for index, image in enumerate(images)
+    ]
+    return ad_request
+
+
+def test_admit_parallel(mutate, mock_policy, mock_get_trusted_digest):
+    images = [
+        "securesystemsengineering/sidecar:v1",
+        "securesystemsengineering/app:v1",
+        "k8s.gcr.io/pause:3.2",
+        "securesystemsengineering/sidecar:v1",
+    ]
+    review = mutate.admit(get_pod_request(images))
+    patches = json.loads(base64.b64decode(review["response"]["patch"]))
+    digest = "1" * 64
+    assert patches == [
+        {
+            "op": "replace",
+            "path": "/spec/containers/0/image",
+            "value": f"docker.io/securesystemsengineering/sidecar@sha256:{digest}",
+        },
+        {
+            "op": "replace",
+            "path": "/spec/containers/1/image",
+            "value": f"docker.io/securesystemsengineering/app@sha256:{digest}",
+        },
+        {
+            "op": "replace",
+            "path": "/spec/containers/3/image",
+            "value": f"docker.io/securesystemsengineering/sidecar@sha256:{digest}",
+        },
+    ]
+    # identical images are only verified once
+    assert sorted(mock_get_trusted_digest) == [
+        "docker.io/securesystemsengineering/app:v1",
+        "docker.io/securesystemsengineering/sidecar:v1",
+    ]
+
+
+def test_admit_parallel_error(mutate, mock_policy, mock_get_trusted_digest):
+    images = [
+        "securesystemsengineering/sidecar:v1",
+        "securesystemsengineering/unsigned:v1",
+        "securesystemsengineering/app:v1",
+    ]
+    with pytest.raises(BaseConnaisseurException) as err:
+        mutate.admit(get_pod_request(images))
+    assert "no trust data." in str(err.value)
+    assert err.value.context["image"] == "securesystemsengineering/unsigned:v1"
+
+
+def test_admit_coalesces_verifications(
+    mutate, monkeypatch, mock_policy, mock_get_trusted_digest, mocker
+):
+    monkeypatch.setenv("NOTARY_SERVER", "notary.docker.io")
+    spy = mocker.spy(muta.DIGEST_REQUESTS, "do")
+    mutate.admit(get_pod_request(["securesystemsengineering/app:v1"]))
+    host, image, rule = spy.call_args[0][0]
+    assert (host, image) == (
+        "notary.docker.io",
+        "docker.io/securesystemsengineering/app:v1",
+    )
+    assert json.loads(rule)["pattern"] == "docker.io/securesystemsengineering/*:*"
+
+
+def test_admit_shared_error_context(mutate, monkeypatch, mock_policy):
+    shared_context = {"tuf_role": "targets"}
+
+    def m_get_trusted_digest(host: str, image, policy_rule: dict):
+        raise BaseConnaisseurException("no trust data.", shared_context)
+
+    monkeypatch.setattr(muta, "get_trusted_digest", m_get_trusted_digest)
+    with pytest.raises(BaseConnaisseurException) as err:
+        mutate.admit(get_pod_request(["securesystemsengineering/unsigned:v1"]))
+    assert err.value.context["image"] == "securesystemsengineering/unsigned:v1"
+    assert shared_context == {"tuf_role": "targets"}
+
+
+def test_get_parent_images_coalesced(mutate, mock_kube_request, mocker):
+    spy = mocker.spy(muta.PARENT_REQUESTS, "do")
+    ad_request = get_ad_request("tests/data/ad_request_replicasets.json")
+    mutate.get_parent_images(ad_request, 0, "namespace")
+    assert spy.call_args[0][:2] == (
+        "apis/apps/v1/namespaces/namespace/deployments/charlie-deployment",
+        muta.request_kube_api,
+    )
@@ -1,3 +1,4 @@
+import base64
 import json
 import re
 import os
@@ -7,11 +8,18 @@ import pytz
 import datetime as dt
 import connaisseur.trust_data
 import connaisseur.notary_api as notary_api
+from connaisseur.cache import TTLCache
 from connaisseur.image import Image
 from connaisseur.tuf_role import TUFRole
 from connaisseur.exceptions import BaseConnaisseurException
 
 
+@pytest.fixture(autouse=True)
+def mock_token_cache(monkeypatch):
+    monkeypatch.setattr(notary_api, "TOKEN_CACHE", TTLCache(maxsize=8))
+    monkeypatch.setattr(notary_api, "AUTH_URLS", TTLCache(maxsize=8))
+
+
 @pytest.fixture
 def napi(monkeypatch):
     monkeypatch.setenv("IS_ACR", "0")
@@ -29,20 +37,27 @@ def acrapi(monkeypatch):
 @pytest.fixture
 def mock_request(monkeypatch):
     class MockResponse:
-        content: dict
+        content: bytes
         headers: dict
         status_code: int = 200
 
         def __init__(self, content: dict, headers: dict = None, status_code: int = 200):
-            self.content = content
-            self.headers = headers
+            self.content = json.dumps(content, separators=(",", ":")).encode()
+            self.headers = headers or {}
             self.status_code = status_code
 
         def raise_for_status(self):
             pass
 
         def json(self):
-            return self.content
+            return json.loads(self.content)
+
+        def iter_content(self, chunk_size: int = 1):
+            for i in range(0, len(self.content), chunk_size):
+                yield self.content[i : i + chunk_size]
+
+        def close(self):
+            pass
 
     def mock_get_request(**kwargs):
         regex = (
@@ -100,7 +115,7 @@ def mock_request(monkeypatch):
 
         return MockResponse(file_content)
 
-    monkeypatch.setattr(requests, "get", mock_get_request)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(mock_get_request))
 
 
 @pytest.fixture
@@ -108,12 +123,13 @@ def mock_trust_data(monkeypatch):
     def validate_expiry(self):
         pass
 
-    def trust_init(self, data: dict, role: str):
+    def trust_init(self, data: dict, role: str, raw: bytes = None):
         self.schema_path = "res/targets_schema.json"
         self.kind = role
         self._validate_schema(data)
         self.signed = data["signed"]
         self.signatures = data["signatures"]
+        self.raw = raw
 
     monkeypatch.setattr(
         connaisseur.trust_data.TrustData, "validate_expiry", validate_expiry
@@ -182,6 +198,40 @@ def test_get_trust_data_error(napi, mock_request, mock_trust_data):
     assert 'no trust data for image "empty.io/image:tag".' in str(err.value)
 
 
+@pytest.mark.parametrize("max_length", [None, 256])
+def test_get_trust_data_max_length(
+    napi, monkeypatch, mock_request, mock_trust_data, max_length
+):
+    # the sample targets are larger than 256 bytes
+    monkeypatch.setattr(napi, "MAX_TRUST_DATA_SIZE", 4096 if max_length else 256)
+    monkeypatch.setattr(napi, "CHUNK_SIZE", 64)
+    with pytest.raises(BaseConnaisseurException) as err:
+        napi.get_trust_data(
+            "host", Image("sample-image"), TUFRole("targets"), max_length=max_length
+        )
+    assert "trust data exceeds maximum size." in str(err.value)
+    assert err.value.context["limit"] == 256
+
+
+def test_get_trust_data_content_length(napi, monkeypatch, mock_request):
+    mock_get = requests.Session.get
+
+    def get_request(**kwargs):
+        assert kwargs["stream"] is True
+        response = mock_get(**kwargs)
+        response.headers = {"Content-Length": "4096"}
+        response.iter_content = None
+        return response
+
+    monkeypatch.setattr(requests.Session, "get", staticmethod(get_request))
+    with pytest.raises(BaseConnaisseurException) as err:
+        napi.get_trust_data(
+            "host", Image("sample-image"), TUFRole("targets"), max_length=2048
+        )
+    assert "trust data exceeds maximum size." in str(err.value)
+    assert err.value.context["length"] == 4096
+
+
 def test_parse_auth(napi):
     header = (
         'Bearer realm="https://core.harbor.domain/service/token",'
@@ -293,3 +343,81 @@ def test_get_auth_token_error_acr(acrapi, mock_request, url: str, error: str):
     with pytest.raises(BaseConnaisseurException) as err:
         acrapi.get_auth_token(url)
     assert error in str(err.value)
+
+
+@pytest.fixture
+def requested_urls(monkeypatch, mock_request):
+    requested_urls = []
+    mock_get = requests.Session.get
+
+    def counting_get_request(**kwargs):
+        headers = kwargs.get("headers") or {}
+        requested_urls.append((kwargs["url"], headers.get("Authorization")))
+        if headers.get("Authorization") == "Bearer stale.token":
+            kwargs.pop("headers")
+        return mock_get(**kwargs)
+
+    monkeypatch.setattr(requests.Session, "get", staticmethod(counting_get_request))
+    return requested_urls
+
+
+def test_get_trust_data_caches_token(napi, mock_trust_data, requested_urls):
+    image = Image("auth.io/sample-image:tag")
+    napi.get_trust_data("host", image, TUFRole("targets"))
+    assert [auth for _, auth in requested_urls] == [None, None, "Bearer no.BA.no"]
+
+    # the cached token is sent right away for all roles of the repository
+    requested_urls.clear()
+    napi.get_trust_data("host", image, TUFRole("root"))
+    assert requested_urls == [
+        (
+            "https://host/v2/auth.io/sample-image/_trust/tuf/root.json",
+            "Bearer no.BA.no",
+        )
+    ]
+
+
+def test_get_trust_data_renews_rejected_token(napi, mock_trust_data, requested_urls):
+    image = Image("auth.io/sample-image:tag")
+    auth_url = (
+        "https://core.harbor.domain/service/token?service=harbor-notary"
+        "&scope=repository:core.harbor.domain/connaisseur/sample-image:pull"
+    )
+    napi.AUTH_URLS.set("https://host/v2/auth.io/sample-image", auth_url)
+    napi.TOKEN_CACHE.set(auth_url, "stale.token")
+
+    napi.get_trust_data("host", image, TUFRole("targets"))
+    assert [auth for _, auth in requested_urls] == [
+        "Bearer stale.token",
+        None,
+        "Bearer no.BA.no",
+    ]
+    assert napi.TOKEN_CACHE.get(auth_url) == "no.BA.no"
+
+
+def test_get_auth_token_cached(napi, mock_request):
+    url = "https://auth.server.good/token/very/good"
+    assert napi.get_auth_token(url) == "no.BA.no"
+    assert napi.TOKEN_CACHE.get(url) == "no.BA.no"
+
+
+def jwt(claims: dict):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode()
+    return f"eyJhbGciOiJFUzI1NiJ9.{payload.rstrip('=')}.c2ln"
+
+
+@pytest.mark.parametrize(
+    "token, expires_in, lifetime",
+    [
+        ("no.BA.no", 300, 300),
+        ("no.BA.no", "300", 300),
+        (jwt({"exp": 1000}), 300, 300),
+        (jwt({"exp": 1000}), None, 900),
+        (jwt({"sub": "me"}), None, 60),
+        ("no.BA.no", None, 60),
+        ("no.BA.no", "soon", 60),
+    ],
+)
+def test_get_token_lifetime(napi, monkeypatch, token, expires_in, lifetime):
+    monkeypatch.setattr(napi.time, "time", lambda: 100)
+    assert napi.get_token_lifetime(token, expires_in) == lifetime
@@ -1,3 +1,4 @@
+import fnmatch
 import pytest
 import connaisseur.policy
 from connaisseur.image import Image
@@ -129,8 +130,7 @@ def test_get_matching_rule(pol, mock_policy, image: str, rule: dict):
 
 
 def test_get_matching_rule_error(pol, mock_policy):
-    p = pol.ImagePolicy()
-    p.policy["rules"] = p.policy["rules"][1:]
+    p = pol.ImagePolicy({"rules": policy["rules"][1:]})
     with pytest.raises(BaseConnaisseurException) as err:
         p.get_matching_rule(Image("reg.io/image"))
     assert (
@@ -138,8 +138,196 @@ def test_get_matching_rule_error(pol, mock_policy):
     ) in str(err.value)
 
 
+@pytest.mark.parametrize(
+    "image",
+    [
+        "image:tag",
+        "reg.io/image:tag",
+        "k8s.gcr.io/path/image:v1",
+        "k8s.gcr.io/image@sha256:" + "a" * 64,
+        "gcr.io/path/to/image:v1",
+        "docker.io/securesystemsengineering/sample:v1",
+        "docker.io/securesystemsengineering/sample:v4",
+        "docker.io/securesystemsengineering/sample-san-sama:hai",
+        "docker.io/securesystemsengineering/connaisseur:helm-hook",
+        "docker.io/securesystemsengineering/sub/path/image:v1",
+        "docker.io/securesystemsengineering/sample@sha256:" + "b" * 64,
+    ],
+)
+def test_rule_matcher(pol, image: str):
+    rules = policy["rules"] + [
+        {"pattern": "gcr.io/path/*", "verify": True},
+        {"pattern": "gcr.io/pa?h/to/ima[gG]e:*", "verify": True},
+        {"pattern": "*/securesystemsengineering/sample:v*", "verify": False},
+        {"pattern": "*@sha256:*", "verify": True},
+        {"pattern": "docker.io/securesystemsengineering/*:*", "verify": False},
+    ]
+
+    # the matcher must find the same rule as a linear scan over all rules
+    best_match = pol.Match("", "")
+    for rule in rules:
+        pattern = rule["pattern"]
+        if fnmatch.fnmatch(image, pattern if ":" in pattern else f"{pattern}:*"):
+            best_match = pol.Match(pattern, image).compare(best_match)
+    expected_rule = next(filter(lambda x: x["pattern"] == best_match.key, rules))
+
+    assert pol.RuleMatcher(rules).match(image) is expected_rule
+
+
+def test_rule_matcher_no_match(pol):
+    matcher = pol.RuleMatcher([{"pattern": "docker.io/*", "verify": True}])
+    assert matcher.match("quay.io/image:tag") is None
+    assert matcher.match("docker.io/image:tag") is not None
+
+
 def test_image_pol_error(pol, mock_policy):
     policy["rules"] += {"pattern": "***"}
     with pytest.raises(BaseConnaisseurException) as err:
         assert pol.ImagePolicy()
     assert "invalid format for image policy." in str(err.value)
+
+
+watched_policy = {"rules": [{"pattern": "*:*", "verify": True}]}
+
+
+def policy_resource(resource_version: str, spec: dict = None):
+    return {
+        "metadata": {"name": "connaisseur-policy", "resourceVersion": resource_version},
+        "spec": spec or watched_policy,
+    }
+
+
+@pytest.fixture
+def mock_kube_api(monkeypatch):
+    class MockKubeApi:
+        requests: list = []
+        events: list = []
+
+        def request_kube_api(self, path: str):
+            self.requests.append(path)
+            return policy_resource("1")
+
+        def watch_kube_api(self, path: str, resource_version: str):
+            self.requests.append((path, resource_version))
+            yield from self.events
+
+    mock = MockKubeApi()
+    monkeypatch.setenv("CONNAISSEUR_IMAGE_POLICY", "connaisseur-policy")
+    monkeypatch.setattr(
+        connaisseur.policy.api, "request_kube_api", mock.request_kube_api
+    )
+    monkeypatch.setattr(connaisseur.policy.api, "watch_kube_api", mock.watch_kube_api)
+    connaisseur.policy.ImagePolicy.JSON_SCHEMA_PATH = "res/policy_schema.json"
+    return mock
+
+
+def test_image_pol_given_policy(pol, mock_kube_api):
+    p = pol.ImagePolicy({"rules": [{"pattern": "*:*", "verify": True}]})
+    assert p.policy == {"rules": [{"pattern": "*:*", "verify": True}]}
+    assert mock_kube_api.requests == []
+
+
+def test_policy_watcher_get_policy_not_started(pol, mock_kube_api, monkeypatch):
+    monkeypatch.setattr(
+        pol.ImagePolicy, "get_image_policy", staticmethod(lambda: watched_policy)
+    )
+    watcher = pol.ImagePolicyWatcher()
+    assert watcher.get_policy().policy == watched_policy
+    assert watcher.get_policy() is not watcher.get_policy()
+    assert watcher.policy is None
+
+
+def test_policy_watcher_refresh(pol, mock_kube_api):
+    watcher = pol.ImagePolicyWatcher()
+    watcher.refresh()
+    assert mock_kube_api.requests == [
+        "apis/connaisseur.policy/v1/imagepolicies/connaisseur-policy"
+    ]
+    assert watcher.resource_version == "1"
+    assert watcher.get_policy().policy == watched_policy
+
+
+def test_policy_watcher_update(pol, mock_kube_api, mocker):
+    watcher = pol.ImagePolicyWatcher()
+    watcher.update(policy_resource("1"))
+    current_policy = watcher.get_policy()
+
+    # same resource version, no need to validate again
+    spy = mocker.spy(pol, "validate")
+    watcher.update(policy_resource("1"))
+    assert watcher.get_policy() is current_policy
+    assert spy.call_count == 0
+
+    new_policy = {"rules": [{"pattern": "*:*", "verify": False}]}
+    watcher.update(policy_resource("2", new_policy))
+    assert spy.call_count == 1
+    assert watcher.get_policy().policy == new_policy
+    assert watcher.resource_version == "2"
+
+
+def test_policy_watcher_update_invalid(pol, mock_kube_api):
+    watcher = pol.ImagePolicyWatcher()
+    watcher.update(policy_resource("1"))
+    watcher.update(policy_resource("2", {"rules": [{"verify": False}]}))
+    assert watcher.policy is None
+    assert watcher.resource_version == "2"
+
+
+@pytest.mark.parametrize(
+    "event, resource_version, has_policy",
+    [
+        ({"type": "MODIFIED", "object": policy_resource("2")}, "2", True),
+        ({"type": "ADDED", "object": policy_resource("3")}, "3", True),
+        ({"type": "DELETED", "object": policy_resource("4")}, "4", False),
+        (
+            {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "5"}}},
+            "5",
+            True,
+        ),
+    ],
+)
+def test_policy_watcher_handle_event(
+    pol, mock_kube_api, event: dict, resource_version: str, has_policy: bool
+):
+    watcher = pol.ImagePolicyWatcher()
+    watcher.update(policy_resource("1"))
+    watcher.handle_event(event)
+    assert watcher.resource_version == resource_version
+    assert (watcher.policy is not None) == has_policy
+
+
+def test_policy_watcher_handle_event_error(pol, mock_kube_api):
+    watcher = pol.ImagePolicyWatcher()
+    event = {"type": "ERROR", "object": {"code": 410, "reason": "Expired"}}
+    with pytest.raises(BaseConnaisseurException) as err:
+        watcher.handle_event(event)
+    assert "watching the image policy failed." in str(err.value)
+
+
+def test_policy_watcher_watch(pol, mock_kube_api):
+    new_policy = {"rules": [{"pattern": "*:*", "verify": False}]}
+    mock_kube_api.events = [
+        {"type": "MODIFIED", "object": policy_resource("2", new_policy)}
+    ]
+    watcher = pol.ImagePolicyWatcher()
+    watcher.watch()
+    assert mock_kube_api.requests == [
+        "apis/connaisseur.policy/v1/imagepolicies/connaisseur-policy",
+        (
+            "apis/connaisseur.policy/v1/imagepolicies"
+            "?fieldSelector=metadata.name%3Dconnaisseur-policy",
+            "1",
+        ),
+    ]
+    assert watcher.get_policy().policy == new_policy
+    assert watcher.resource_version == "2"
+
+
+def test_policy_watcher_start(pol, mock_kube_api, mocker):
+    mock_run = mocker.patch.object(pol.ImagePolicyWatcher, "_run")
+    watcher = pol.ImagePolicyWatcher()
+    watcher.start()
+    watcher.start()
+    watcher._thread.join()
+    assert mock_run.call_count == 1
+    assert watcher.resource_version == "1"
@@ -0,0 +1,73 @@
+import builtins
+import json
+import pytest
+from jsonschema import SchemaError, ValidationError
+import connaisseur.schema as schema
+
+with open("tests/data/sample_timestamp.json", "r") as readfile:
+    sample_timestamp = json.load(readfile)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    schema.load_schema.cache_clear()
+    schema.get_validator.cache_clear()
+    yield
+    schema.load_schema.cache_clear()
+    schema.get_validator.cache_clear()
+
+
+@pytest.fixture
+def invalid_timestamp():
+    timestamp = json.loads(json.dumps(sample_timestamp))
+    timestamp["signed"]["expires"] = "soon"
+    return timestamp
+
+
+def test_load_schema(mocker):
+    mock_open = mocker.spy(builtins, "open")
+    loaded_schema = schema.load_schema("res/policy_schema.json")
+    assert loaded_schema["type"] == "object"
+    assert schema.load_schema("res/policy_schema.json") is loaded_schema
+    mock_open.assert_called_once()
+
+
+def test_get_validator():
+    validator = schema.get_validator("res/policy_schema.json")
+    assert schema.get_validator("res/policy_schema.json") is validator
+    assert schema.get_validator("res/policy_schema.json", True) is not validator
+
+
+def test_get_validator_invalid_schema(tmpdir):
+    path = tmpdir.join("schema.json")
+    path.write(json.dumps({"type": "nothing"}))
+    with pytest.raises(SchemaError):
+        schema.get_validator(str(path))
+
+
+def test_validate():
+    policy = {"rules": [{"pattern": "*:*", "verify": True}]}
+    assert schema.validate(policy, "res/policy_schema.json") is None
+
+
+def test_validate_error():
+    with pytest.raises(ValidationError) as err:
+        schema.validate({"rules": [{}]}, "res/policy_schema.json")
+    assert "'pattern' is a required property" in str(err.value)
+
+
+def test_validate_formats(invalid_timestamp):
+    assert schema.validate(sample_timestamp, "res/timestamp_schema.json", True) is None
+    assert schema.validate(invalid_timestamp, "res/timestamp_schema.json") is None
+    with pytest.raises(ValidationError):
+        schema.validate(invalid_timestamp, "res/timestamp_schema.json", True)
+
+
+def test_validate_fastjsonschema(monkeypatch, invalid_timestamp):
+    pytest.importorskip("fastjsonschema")
+    monkeypatch.setenv("SCHEMA_BACKEND", "fastjsonschema")
+    validator = schema.get_validator("res/timestamp_schema.json", True)
+    assert isinstance(validator, schema.FastValidator)
+    assert validator.validate(sample_timestamp) is None
+    with pytest.raises(ValidationError):
+        validator.validate(invalid_timestamp)
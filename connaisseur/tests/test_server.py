@@ -0,0 +1,43 @@
+import connaisseur.server as server
+from connaisseur.flask_server import APP
+
+
+def test_get_server_options(monkeypatch):
+    monkeypatch.setenv("WEB_WORKERS", "3")
+    monkeypatch.setenv("WEB_THREADS", "8")
+    monkeypatch.setenv("WEB_MAX_REQUESTS", "500")
+    options = server.get_server_options()
+    assert options["workers"] == 3
+    assert options["threads"] == 8
+    assert options["max_requests"] == 500
+    assert options["keepalive"] == 5
+    assert options["graceful_timeout"] == 30
+    assert options["certfile"] == "/etc/certs/tls.crt"
+
+
+def test_application(monkeypatch):
+    monkeypatch.setenv("WEB_WORKERS", "3")
+    application = server.ConnaisseurApplication(APP, server.get_server_options())
+    assert application.load() is APP
+    assert application.cfg.workers == 3
+    assert application.cfg.worker_class_str == "gthread"
+    assert application.cfg.max_requests == 1000
+    assert application.cfg.post_worker_init is server.post_worker_init
+    assert application.cfg.worker_exit is server.worker_exit
+
+
+def test_post_worker_init(mocker):
+    mock_start = mocker.patch("connaisseur.server.POLICY_WATCHER.start")
+    mock_cache_start = mocker.patch("connaisseur.server.WORKLOAD_CACHE.start")
+    server.post_worker_init(None)
+    mock_start.assert_called_once()
+    mock_cache_start.assert_called_once()
+
+
+def test_worker_exit(mocker, monkeypatch):
+    monkeypatch.setenv("ALERT_DRAIN_TIMEOUT", "2")
+    mock_flush = mocker.patch("connaisseur.server.ALERT_AGGREGATOR.flush")
+    mock_drain = mocker.patch("connaisseur.server.ALERT_DISPATCHER.drain")
+    server.worker_exit(None, None)
+    mock_flush.assert_called_once_with(close_all=True)
+    mock_drain.assert_called_once_with(2.0)
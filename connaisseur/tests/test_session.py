@@ -0,0 +1,54 @@
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+import connaisseur.session
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(connaisseur.session, "_SESSIONS", {})
+    return connaisseur.session
+
+
+def test_get_session(session):
+    notary_session = session.get_session("notary")
+    assert isinstance(notary_session, requests.Session)
+    assert session.get_session("notary") is notary_session
+    assert session.get_session("alert") is not notary_session
+
+
+@pytest.mark.parametrize(
+    "pool_size, timeout, out_pool_size, out_timeout",
+    [(None, None, 10, 10.0), ("3", "2.5", 3, 2.5)],
+)
+def test_create_session(
+    session, monkeypatch, pool_size, timeout, out_pool_size, out_timeout
+):
+    if pool_size:
+        monkeypatch.setenv("KUBE_API_POOL_SIZE", pool_size)
+    if timeout:
+        monkeypatch.setenv("KUBE_API_TIMEOUT", timeout)
+    adapter = session.create_session("kube_api").get_adapter("https://host")
+    assert isinstance(adapter, session.TimeoutHTTPAdapter)
+    assert adapter.timeout == out_timeout
+    assert adapter._pool_maxsize == out_pool_size
+    assert adapter._pool_connections == out_pool_size
+
+
+@pytest.mark.parametrize("timeout, out", [(None, 4), (1, 1), ((1, 60), (1, 60))])
+def test_timeout_adapter(monkeypatch, timeout, out):
+    sent_kwargs = {}
+
+    def mock_send(self, request, **kwargs):
+        sent_kwargs.update(kwargs)
+
+    monkeypatch.setattr(HTTPAdapter, "send", mock_send)
+    connaisseur.session.TimeoutHTTPAdapter(4).send(None, timeout=timeout)
+    assert sent_kwargs["timeout"] == out
+
+
+def test_session_keeps_no_cookies(session, requests_mock):
+    requests_mock.get("https://host/path", cookies={"tracking": "id"})
+    notary_session = session.get_session("notary")
+    notary_session.get("https://host/path")
+    assert len(notary_session.cookies) == 0
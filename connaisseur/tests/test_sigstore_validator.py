@@ -1,8 +1,10 @@
+import fcntl
 import pytest
 import pytest_subprocess
 import subprocess
 
 import connaisseur.sigstore_validator as sigstore_validator
+from connaisseur.cache import TTLCache
 from connaisseur.exceptions import (
     NotFoundException,
     ValidationError,
@@ -38,6 +40,18 @@ The following checks were performed on each of these signatures:
 """
 
 
+@pytest.fixture(autouse=True)
+def mock_cosign_cache(monkeypatch):
+    monkeypatch.setattr(sigstore_validator, "COSIGN_CACHE", TTLCache(maxsize=8, ttl=30))
+
+
+@pytest.fixture(autouse=True)
+def mock_cosign_limiter(monkeypatch, tmpdir):
+    limiter = sigstore_validator.CosignLimiter(4, str(tmpdir))
+    monkeypatch.setattr(sigstore_validator, "COSIGN_LIMITER", limiter)
+    return limiter
+
+
 @pytest.fixture()
 def mock_add_kill_fake_process(monkeypatch):
     def mock_kill(self):
@@ -259,3 +273,99 @@ def test_invoke_cosign_timeout_expired(
 
     mock_kill.assert_has_calls([mocker.call()])
     assert "cosign timed out." in str(err.value)
+
+
+def test_get_cosign_validated_digests_cached(mocker):
+    mock_invoke = mocker.patch(
+        "connaisseur.sigstore_validator.invoke_cosign",
+        return_value=(0, cosign_payload, cosign_stderr_at_success),
+    )
+    digest = "c5327b291d702719a26c6cf8cc93f72e7902df46547106a9930feda2c002a4a7"
+    for _ in range(2):
+        digests = sigstore_validator.get_cosign_validated_digests("image:v1", "sth")
+        assert digests == [digest]
+    mock_invoke.assert_called_once()
+
+    # other public keys need to be validated separately
+    sigstore_validator.get_cosign_validated_digests("image:v1", "other")
+    assert mock_invoke.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "status_code, stdout, stderr",
+    [(1, "", cosign_error_message_wrong_pubkey)],
+)
+def test_get_cosign_validated_digests_error_not_cached(
+    mock_invoke_cosign, status_code, stdout, stderr
+):
+    for _ in range(2):
+        with pytest.raises(ValidationError):
+            sigstore_validator.get_cosign_validated_digests("image:v1", "sth")
+    assert sigstore_validator.COSIGN_CACHE.get(("image:v1", "sth")) is None
+
+
+def test_invoke_cosign_concurrency_limit(monkeypatch, fake_process, tmpdir):
+    limiter = sigstore_validator.CosignLimiter(1, str(tmpdir))
+    monkeypatch.setattr(sigstore_validator, "COSIGN_LIMITER", limiter)
+
+    # no further cosign process may start while this one is running, neither in
+    # this worker nor in another one
+    def stdin_function(input):
+        with open(tmpdir.join("cosign-0.lock"), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+        return {"stdout": str(acquired), "stderr": str(acquired)}
+
+    fake_process.register_subprocess(
+        ["/app/cosign/cosign", "verify", "-key", "/dev/stdin", "testimage:v1"],
+        stdin_callable=stdin_function,
+    )
+    _, stdout, _ = sigstore_validator.invoke_cosign("testimage:v1", example_pubkey)
+    assert stdout == "False"
+    with limiter.slot():
+        pass
+
+
+def test_cosign_limiter_waits_for_slot(tmpdir, mocker):
+    limiter = sigstore_validator.CosignLimiter(2, str(tmpdir))
+    # a slot taken by another worker process
+    other_worker = open(tmpdir.join("cosign-0.lock"), "a")
+    fcntl.flock(other_worker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    with limiter.slot():
+        # both slots are taken now, so the next caller has to wait
+        def release(_):
+            fcntl.flock(other_worker, fcntl.LOCK_UN)
+
+        mock_sleep = mocker.patch("time.sleep", side_effect=release)
+        with limiter.slot():
+            pass
+        mock_sleep.assert_called_once_with(limiter.poll_interval)
+    other_worker.close()
+
+
+def test_cosign_limiter_timeout(tmpdir, mocker):
+    limiter = sigstore_validator.CosignLimiter(1, str(tmpdir), timeout=0.2)
+    # the only slot is taken by another worker process
+    other_worker = open(tmpdir.join("cosign-0.lock"), "a")
+    fcntl.flock(other_worker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    mocker.patch("time.sleep")
+    with pytest.raises(CosignTimeout) as err:
+        with limiter.slot():
+            pass
+    assert "waiting for a free cosign slot timed out." in str(err.value)
+    other_worker.close()
+
+    # the slot of this worker was given back
+    with limiter.slot():
+        pass
+
+
+def test_cosign_limiter_timeout_busy_worker(tmpdir):
+    limiter = sigstore_validator.CosignLimiter(1, str(tmpdir), timeout=0.01)
+    with limiter.slot():
+        with pytest.raises(CosignTimeout):
+            with limiter.slot():
+                pass
@@ -217,12 +217,13 @@ def td():
 
 @pytest.fixture
 def mock_schema_path(monkeypatch):
-    def trust_init(self, data: dict, role: str):
+    def trust_init(self, data: dict, role: str, raw: bytes = None):
         self.schema_path = "res/targets_schema.json"
         self.kind = role
         self._validate_schema(data)
         self.signed = data["signed"]
         self.signatures = data["signatures"]
+        self.raw = raw
 
     monkeypatch.setattr(connaisseur.trust_data.TargetsData, "__init__", trust_init)
     connaisseur.trust_data.TrustData.schema_path = "res/{}_schema.json"
@@ -394,6 +395,31 @@ def test_validate_hash_error(td, mock_schema_path, mock_keystore):
     assert "failed validating trust data hash." in str(err.value)
 
 
+def test_validate_hash_raw(td, mock_schema_path, mock_keystore):
+    data = trust_data("tests/data/sample_root.json")
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    ks = KeyStore()
+
+    # the raw bytes are hashed instead of the parsed document
+    data["signed"]["version"] += 1
+    assert td.TrustData(data, "root", raw=raw).validate_hash(ks) is None
+    with pytest.raises(ValidationError):
+        td.TrustData(data, "root").validate_hash(ks)
+    with pytest.raises(ValidationError):
+        td.TrustData(data, "root", raw=raw + b" ").validate_hash(ks)
+
+
+def test_get_signed_bytes(td, mock_schema_path, mocker):
+    data = trust_data("tests/data/sample_releases.json")
+    trust_data_ = td.TrustData(data, "targets/releases")
+    expected = json.dumps(data["signed"], separators=(",", ":")).encode()
+    mock_dumps = mocker.spy(td.json, "dumps")
+    signed_bytes = trust_data_.get_signed_bytes()
+    assert trust_data_.get_signed_bytes() is signed_bytes
+    assert mock_dumps.call_count == 1
+    assert signed_bytes == expected
+
+
 @pytest.mark.parametrize(
     "data, role",
     [
@@ -537,6 +563,37 @@ def test_get_digest_error(td, mock_schema_path):
     assert 'could not find digest for tag "hurr".' in str(err.value)
 
 
+@pytest.mark.parametrize(
+    "data, digest, tags",
+    [
+        (trust_data("tests/data/sample_targets.json"), "1388abc7", []),
+        (
+            trust_data("tests/data/sample3_targets.json"),
+            "548e79fefbf3ae9b00a8f0e7d670a52b7dabaf90d8c33e35485ed3b2816719b4",
+            ["v1.0.9", "v1.0.9-slim-fat_image"],
+        ),
+        (
+            trust_data("tests/data/sample3_targets.json"),
+            "b407c003c52d480a5136f0872e5671ffa73ac7c8c780a19045978611f0eed6f1",
+            ["v382"],
+        ),
+    ],
+)
+def test_get_tags_for_digest(td, mock_schema_path, data: dict, digest: str, tags: list):
+    trust_data = td.TrustData(data, "targets")
+    assert trust_data.get_tags_for_digest(digest) == tags
+
+
+def test_get_digest_index(td, mock_schema_path):
+    _trust_data = td.TrustData(trust_data("tests/data/sample_releases.json"), "targets")
+    index = _trust_data.get_digest_index()
+    assert index == {
+        "1388abc7a12532836c3a81bdb0087409b15208f5aeba7a87aedcfd56d637c145": ["v1"],
+        "b8a38522876a9e2550d582ce51a1d87ebdc6c570e5e585d08560bfd646f7f804": ["v2"],
+    }
+    assert _trust_data.get_digest_index() is index
+
+
 # This test will fail in January 2023 due to the expiry date in the test data
 # TODO: Autogenerate test data with "up-to-date" expiry dates
 @pytest.mark.parametrize(
@@ -589,3 +646,10 @@ def test_validation_for_signature_validation_error(
     with pytest.raises(ValidationError) as err:
         _trust_data.validate(ks)
     assert "failed to verify signature of trust data." in str(err.value)
+
+
+def test_get_expiry(td, mock_schema_path):
+    trust_data_ = td.TrustData(trust_data("tests/data/sample_root.json"), "root")
+    assert trust_data_.get_expiry() == dt.datetime(
+        2030, 1, 10, 15, 54, 54, 556992, tzinfo=pytz.utc
+    )
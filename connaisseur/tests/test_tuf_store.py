@@ -0,0 +1,120 @@
+import json
+import os
+import pytest
+import connaisseur.trust_data
+import connaisseur.tuf_store as store
+from connaisseur.image import Image
+
+
+@pytest.fixture
+def mock_schema_path(monkeypatch):
+    def trust_init(self, data: dict, role: str, raw: bytes = None):
+        self.schema_path = "res/targets_schema.json"
+        self.kind = role
+        self._validate_schema(data)
+        self.signed = data["signed"]
+        self.signatures = data["signatures"]
+        self.raw = raw
+
+    monkeypatch.setattr(connaisseur.trust_data.TargetsData, "__init__", trust_init)
+    monkeypatch.setattr(
+        connaisseur.trust_data.TrustData, "schema_path", "res/{}_schema.json"
+    )
+
+
+def get_trust_data():
+    trust_data = {}
+    for role in ("root", "snapshot", "timestamp", "targets"):
+        with open(f"tests/data/sample_{role}.json", "r") as file:
+            raw = file.read()
+            trust_data[role] = connaisseur.trust_data.TrustData(
+                json.loads(raw), role, raw.encode()
+            )
+    trust_data["targets/releases"] = None
+    return trust_data
+
+
+@pytest.mark.parametrize(
+    "image, gun",
+    [
+        ("image", "docker.io/image"),
+        (
+            "securesystemsengineering/sample:v1",
+            "docker.io/securesystemsengineering/sample",
+        ),
+        ("registry.io/image@sha256:" + "1" * 64, "registry.io/image"),
+        ("registry.io/a/b/image:v1", "registry.io/a/b/image"),
+    ],
+)
+def test_get_gun(image: str, gun: str):
+    assert store.TUFMetadataStore.get_gun(Image(image)) == gun
+
+
+def test_get_set(mock_schema_path):
+    metadata_store = store.TUFMetadataStore(maxsize=2)
+    trust_data = get_trust_data()
+    image = Image("securesystemsengineering/sample:v1")
+
+    assert metadata_store.get("host", image) is None
+    metadata_store.set("host", image, trust_data)
+    # all tags of an image share the same trust data
+    assert metadata_store.get("host", Image("securesystemsengineering/sample:v2")) == (
+        trust_data
+    )
+    assert metadata_store.get("other", image) is None
+
+    # modifying the returned trust data doesn't change the stored one
+    metadata_store.get("host", image).pop("root")
+    assert "root" in metadata_store.get("host", image)
+
+    metadata_store.clear()
+    assert metadata_store.get("host", image) is None
+
+
+def test_disk(mock_schema_path, tmpdir):
+    directory = str(tmpdir)
+    trust_data = get_trust_data()
+    image = Image("securesystemsengineering/sample:v1")
+
+    store.TUFMetadataStore(maxsize=2, directory=directory).set(
+        "host", image, trust_data
+    )
+    assert len(os.listdir(directory)) == 1
+
+    stored_trust_data = store.TUFMetadataStore(maxsize=2, directory=directory).get(
+        "host", image
+    )
+    assert stored_trust_data.keys() == trust_data.keys()
+    assert stored_trust_data["targets/releases"] is None
+    for role in ("root", "snapshot", "timestamp", "targets"):
+        assert isinstance(stored_trust_data[role], type(trust_data[role]))
+        assert stored_trust_data[role].signed == trust_data[role].signed
+        assert stored_trust_data[role].signatures == trust_data[role].signatures
+        assert stored_trust_data[role].raw == trust_data[role].raw
+
+
+def test_disk_invalid(mock_schema_path, tmpdir):
+    directory = str(tmpdir)
+    metadata_store = store.TUFMetadataStore(maxsize=2, directory=directory)
+    image = Image("securesystemsengineering/sample:v1")
+    metadata_store.set("host", image, get_trust_data())
+    metadata_store.clear()
+
+    path = os.path.join(directory, os.listdir(directory)[0])
+    with open(path, "w") as file:
+        json.dump({"root": {"signed": {}}}, file)
+
+    assert metadata_store.get("host", image) is None
+
+
+def test_delete(mock_schema_path, tmpdir):
+    directory = str(tmpdir)
+    metadata_store = store.TUFMetadataStore(maxsize=2, directory=directory)
+    image = Image("securesystemsengineering/sample:v1")
+    metadata_store.set("host", image, get_trust_data())
+
+    metadata_store.delete("host", image)
+    assert metadata_store.get("host", image) is None
+    assert os.listdir(directory) == []
+    # deleting missing trust data is no error
+    metadata_store.delete("host", image)
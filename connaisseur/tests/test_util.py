@@ -1,3 +1,5 @@
+import base64
+import json
 import pytest
 import connaisseur.util
 
@@ -12,3 +14,21 @@ import connaisseur.util
 )
 def test_normalize_delegation(delegation_role: str, out: str):
     assert connaisseur.util.normalize_delegation(delegation_role) == out
+
+
+def make_jwt(expiry: float):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": expiry}).encode())
+    return f"header.{payload.decode().rstrip('=')}.signature"
+
+
+@pytest.mark.parametrize(
+    "token, expiry",
+    [
+        (make_jwt(1234), 1234),
+        ("token", None),
+        ("header.bm90IGpzb24.signature", None),
+        (make_jwt("soon"), None),
+    ],
+)
+def test_get_token_expiry(token: str, expiry):
+    assert connaisseur.util.get_token_expiry(token) == expiry
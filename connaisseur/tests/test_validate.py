@@ -2,10 +2,16 @@ import os
 import pytest
 import pytest_subprocess
 import re
+import threading
 import json
 import requests
+import pytz
+import datetime as dt
+import connaisseur.sigstore_validator
 import connaisseur.trust_data
 import connaisseur.validate as val
+from connaisseur.cache import TTLCache
+from connaisseur.tuf_store import TUFMetadataStore
 from connaisseur.image import Image
 from connaisseur.key_store import KeyStore
 from connaisseur.exceptions import BaseConnaisseurException
@@ -102,23 +108,44 @@ alt_root_pub = (
 )
 
 
+@pytest.fixture(autouse=True)
+def mock_tuf_store(monkeypatch):
+    monkeypatch.setattr(val, "TUF_METADATA_STORE", TUFMetadataStore(maxsize=16))
+
+
+@pytest.fixture(autouse=True)
+def mock_cosign_limiter(monkeypatch, tmpdir):
+    monkeypatch.setattr(
+        connaisseur.sigstore_validator,
+        "COSIGN_LIMITER",
+        connaisseur.sigstore_validator.CosignLimiter(4, str(tmpdir)),
+    )
+
+
 @pytest.fixture
 def mock_request(monkeypatch):
     class MockResponse:
-        content: dict
+        content: bytes
         headers: dict
         status_code: int = 200
 
         def __init__(self, content: dict, headers: dict = None, status_code: int = 200):
-            self.content = content
-            self.headers = headers
+            self.content = json.dumps(content, separators=(",", ":")).encode()
+            self.headers = headers or {}
             self.status_code = status_code
 
         def raise_for_status(self):
             pass
 
         def json(self):
-            return self.content
+            return json.loads(self.content)
+
+        def iter_content(self, chunk_size: int = 1):
+            for i in range(0, len(self.content), chunk_size):
+                yield self.content[i : i + chunk_size]
+
+        def close(self):
+            pass
 
     def mock_get_request(**kwargs):
         regex = (
@@ -176,7 +203,7 @@ def mock_request(monkeypatch):
 
         return MockResponse(file_content)
 
-    monkeypatch.setattr(requests, "get", mock_get_request)
+    monkeypatch.setattr(requests.Session, "get", staticmethod(mock_get_request))
 
 
 @pytest.fixture
@@ -201,12 +228,13 @@ def mock_trust_data(monkeypatch):
     def validate_expiry(self):
         pass
 
-    def trust_init(self, data: dict, role: str):
+    def trust_init(self, data: dict, role: str, raw: bytes = None):
         self.schema_path = "res/targets_schema.json"
         self.kind = role
         self._validate_schema(data)
         self.signed = data["signed"]
         self.signatures = data["signatures"]
+        self.raw = raw
 
     monkeypatch.setattr(
         connaisseur.trust_data.TrustData, "validate_expiry", validate_expiry
@@ -319,6 +347,14 @@ def test_get_trusted_digest_error(
     assert error in str(err.value)
 
 
+def get_validated_image_targets(host: str, image: Image, req_delegations: list):
+    trust_data = val.get_validated_trust_data(host, image, req_delegations)
+    return [
+        data.signed.get("targets", {})
+        for data in val.get_image_targets_data(trust_data, image, req_delegations)
+    ]
+
+
 @pytest.mark.parametrize(
     "image, req_delegations, targets, root_pub",
     [
@@ -356,7 +392,7 @@ def test_get_trusted_digest_error(
         ),
     ],
 )
-def test_process_chain_of_trust(
+def test_validated_image_targets(
     monkeypatch,
     mock_keystore,
     mock_request,
@@ -368,7 +404,7 @@ def test_process_chain_of_trust(
 ):
     if root_pub:
         monkeypatch.setenv("ROOT_PUB", root_pub)
-    assert val.process_chain_of_trust("host", Image(image), req_delegations) == targets
+    assert get_validated_image_targets("host", Image(image), req_delegations) == targets
 
 
 @pytest.mark.parametrize(
@@ -394,7 +430,7 @@ def test_process_chain_of_trust(
         ),
     ],
 )
-def test_process_chain_of_trust_error(
+def test_validated_image_targets_error(
     mock_keystore,
     mock_request,
     mock_trust_data,
@@ -403,7 +439,7 @@ def test_process_chain_of_trust_error(
     error: str,
 ):
     with pytest.raises(BaseConnaisseurException) as err:
-        val.process_chain_of_trust("host", Image(image), req_delegations)
+        get_validated_image_targets("host", Image(image), req_delegations)
     assert error in str(err.value)
 
 
@@ -433,8 +469,10 @@ def test_process_chain_of_trust_error(
         ),
     ],
 )
-def test_search_image_targets_for_digest(image: str, digest: str):
-    data = trust_data("tests/data/sample_releases.json")["signed"]["targets"]
+def test_search_image_targets_for_digest(mock_trust_data, image: str, digest: str):
+    data = connaisseur.trust_data.TrustData(
+        trust_data("tests/data/sample_releases.json"), "targets/releases"
+    )
     assert val.search_image_targets_for_digest(data, Image(image)) == digest
 
 
@@ -452,6 +490,208 @@ def test_search_image_targets_for_digest(image: str, digest: str):
         ("image:v3", None),
     ],
 )
-def test_search_image_targets_for_tag(image: str, digest: str):
-    data = trust_data("tests/data/sample_releases.json")["signed"]["targets"]
+def test_search_image_targets_for_tag(mock_trust_data, image: str, digest: str):
+    data = connaisseur.trust_data.TrustData(
+        trust_data("tests/data/sample_releases.json"), "targets/releases"
+    )
     assert val.search_image_targets_for_tag(data, Image(image)) == digest
+
+
+def test_get_trusted_digest_cached(
+    monkeypatch, mock_trust_data, mock_keystore, mock_request
+):
+    def get_expiry(self):
+        return dt.datetime.now(pytz.utc) + dt.timedelta(days=1)
+
+    requested_urls = []
+    mock_get = requests.Session.get
+
+    def counting_get_request(**kwargs):
+        requested_urls.append(kwargs["url"])
+        return mock_get(**kwargs)
+
+    monkeypatch.setattr(requests.Session, "get", staticmethod(counting_get_request))
+    monkeypatch.setattr(connaisseur.trust_data.TrustData, "get_expiry", get_expiry)
+    monkeypatch.setattr(val, "DIGEST_CACHE", TTLCache(maxsize=2, ttl=60))
+
+    image = Image("securesystemsengineering/sample-image:sign")
+    digest = "a154797b8300165956ee1f16d98f3a1426301c1168f0462c73ce9bc03361cabf"
+    assert val.get_trusted_digest("host", image, policy_rule2) == digest
+    request_count = len(requested_urls)
+    assert request_count > 0
+    assert val.get_trusted_digest("host", image, policy_rule2) == digest
+    assert len(requested_urls) == request_count
+    # a different host is not served from the cache
+    assert val.get_trusted_digest("other", image, policy_rule2) == digest
+    assert len(requested_urls) == 2 * request_count
+
+
+def test_get_trusted_digest_not_cached_beyond_expiry(
+    monkeypatch, mock_trust_data, mock_keystore, mock_request
+):
+    monkeypatch.setattr(val, "DIGEST_CACHE", TTLCache(maxsize=2, ttl=60))
+    image = Image("securesystemsengineering/sample-image:sign")
+    val.get_trusted_digest("host", image, policy_rule2)
+    # the sample trust data is long expired
+    assert len(val.DIGEST_CACHE) == 0
+
+
+def test_get_earliest_expiry(mock_trust_data):
+    data = {
+        "root": connaisseur.trust_data.TrustData(
+            trust_data("tests/data/sample_root.json"), "root"
+        ),
+        "timestamp": connaisseur.trust_data.TrustData(
+            trust_data("tests/data/sample_timestamp.json"), "timestamp"
+        ),
+        "targets/releases": None,
+    }
+    assert val.get_earliest_expiry(data) == min(
+        data["root"].get_expiry(), data["timestamp"].get_expiry()
+    )
+
+
+def test_fetch_trust_data_concurrently(monkeypatch):
+    barrier = threading.Barrier(3, timeout=5)
+    fetched = {}
+
+    def fetch(host: str, image: Image, role, max_length=None):
+        # all roles need to be requested at the same time to pass the barrier
+        barrier.wait()
+        fetched[role.role] = threading.current_thread().name
+        return role.role
+
+    roles = ["root", "snapshot", "targets/releases"]
+    trust_data = val.fetch_trust_data("host", Image("image"), roles, fetch)
+    assert trust_data == {role: role for role in roles}
+    assert all(name.startswith("notary-fetch") for name in fetched.values())
+
+
+def test_fetch_trust_data_error():
+    def fetch(host: str, image: Image, role, max_length=None):
+        if role.role != "root":
+            raise BaseConnaisseurException(f"no {role.role}.")
+        return role.role
+
+    with pytest.raises(BaseConnaisseurException) as err:
+        val.fetch_trust_data("host", Image("image"), ["root", "snapshot"], fetch)
+    assert "no snapshot." in str(err.value)
+
+
+def test_fetch_trust_data_max_lengths():
+    def fetch(host: str, image: Image, role, max_length=None):
+        return max_length
+
+    trust_data = val.fetch_trust_data(
+        "host", Image("image"), ["root", "snapshot"], fetch, {"snapshot": 512}
+    )
+    assert trust_data == {"root": None, "snapshot": 512}
+
+
+def test_get_max_lengths(mock_keystore):
+    key_store = KeyStore()
+    key_store.hashes = {"snapshot": ("hash", 512), "targets/releases": ("hash", 0)}
+    assert val._get_max_lengths(
+        key_store, ["snapshot", "targets/releases", "targets/phbelitz"]
+    ) == {"snapshot": 512}
+
+
+@pytest.mark.parametrize(
+    "image, req_delegations, roles",
+    [
+        (
+            "securesystemsengineering/sample-image",
+            req_delegations2,
+            ["root", "snapshot", "timestamp", "targets"],
+        ),
+        (
+            "securesystemsengineering/alice-image",
+            req_delegations1,
+            [
+                "root",
+                "snapshot",
+                "timestamp",
+                "targets",
+                "targets/phbelitz",
+                "targets/releases",
+                "targets/chamsen",
+            ],
+        ),
+    ],
+)
+def test_validated_image_targets_requests_each_role_once(
+    mock_keystore,
+    mock_request,
+    mock_trust_data,
+    requested_roles,
+    image: str,
+    req_delegations: list,
+    roles: list,
+):
+    get_validated_image_targets("host", Image(image), req_delegations)
+    assert sorted(requested_roles) == sorted(roles)
+
+
+@pytest.fixture
+def requested_roles(monkeypatch):
+    requested_roles = []
+    mock_get = requests.Session.get
+
+    def counting_get_request(**kwargs):
+        requested_roles.append(re.search(r"_trust/tuf/(.+)\.json", kwargs["url"])[1])
+        return mock_get(**kwargs)
+
+    monkeypatch.setattr(requests.Session, "get", staticmethod(counting_get_request))
+    return requested_roles
+
+
+@pytest.mark.parametrize(
+    "image, req_delegations, targets",
+    [
+        ("securesystemsengineering/sample-image", req_delegations2, targets2),
+        ("securesystemsengineering/alice-image", req_delegations1, targets1),
+    ],
+)
+def test_validated_image_targets_reuses_stored_trust_data(
+    mock_keystore,
+    mock_request,
+    mock_trust_data,
+    requested_roles,
+    image: str,
+    req_delegations: list,
+    targets: list,
+):
+    get_validated_image_targets("host", Image(image), req_delegations)
+    requested_roles.clear()
+    assert get_validated_image_targets("host", Image(image), req_delegations) == targets
+    assert requested_roles == ["timestamp"]
+
+
+def test_get_validated_trust_data_error_drops_stored(
+    mock_keystore, mock_request, mock_trust_data
+):
+    image = Image("securesystemsengineering/sample-image")
+    get_validated_image_targets("host", image, req_delegations2)
+    assert val.TUF_METADATA_STORE.get("host", image) is not None
+
+    with pytest.raises(BaseConnaisseurException):
+        val.get_validated_trust_data("host", image, ["targets/nonexistent"])
+    assert val.TUF_METADATA_STORE.get("host", image) is None
+
+
+def test_validated_image_targets_refreshes_changed_snapshot(
+    mock_keystore, mock_request, mock_trust_data, requested_roles
+):
+    image = Image("securesystemsengineering/sample-image")
+    get_validated_image_targets("host", image, req_delegations2)
+
+    # pretend the snapshot changed in the meantime
+    stored_trust_data = val.TUF_METADATA_STORE.get("host", image)
+    stored_trust_data["snapshot"] = connaisseur.trust_data.TrustData(
+        trust_data("tests/data/alice-image/snapshot.json"), "snapshot"
+    )
+    val.TUF_METADATA_STORE.set("host", image, stored_trust_data)
+    requested_roles.clear()
+
+    assert get_validated_image_targets("host", image, req_delegations2) == targets2
+    assert sorted(requested_roles) == ["root", "snapshot", "targets", "timestamp"]
@@ -0,0 +1,190 @@
+import json
+import pytest
+import requests
+import connaisseur.workload_cache as wc
+from connaisseur.exceptions import BaseConnaisseurException
+
+
+def get_workload(kind: str):
+    with open(f"tests/data/{kind}.json", "r") as file:
+        workload = json.load(file)
+    # listed and watched objects don't carry their kind
+    workload.pop("kind")
+    return workload
+
+
+deployment = get_workload("deployments")
+deployment_key = (
+    "test-connaisseur",
+    "Deployment",
+    "sample-san-sama-deployment",
+    "3a3a7b38-5512-4a85-94bb-3562269e0a6a",
+)
+replicaset = get_workload("replicasets")
+replicaset_key = (
+    "test-connaisseur",
+    "ReplicaSet",
+    "sample-san-sama-deployment-84d95bbc48",
+    "60c2cece-3496-411b-b83e-2f0772c15fa0",
+)
+images = ["securesystemsengineering/sample-san-sama:hai"]
+
+
+def workload_list(items: list, resource_version: str, continue_token: str = None):
+    metadata = {"resourceVersion": resource_version}
+    if continue_token:
+        metadata["continue"] = continue_token
+    return {"metadata": metadata, "items": items}
+
+
+@pytest.fixture
+def mock_kube_api(monkeypatch):
+    class MockKubeApi:
+        def __init__(self):
+            self.requests = []
+            self.pages = {}
+            self.events = []
+
+        def request_kube_api(self, path: str):
+            self.requests.append(path)
+            return self.pages[path]
+
+        def watch_kube_api(self, path: str, resource_version: str):
+            self.requests.append((path, resource_version))
+            yield from self.events
+
+    mock = MockKubeApi()
+    mock.pages = {
+        "apis/apps/v1/deployments?limit=500": workload_list([deployment], "10"),
+        "apis/apps/v1/replicasets?limit=500": workload_list([], "20", "next/page"),
+        "apis/apps/v1/replicasets?limit=500&continue=next%2Fpage": workload_list(
+            [replicaset], "21"
+        ),
+    }
+    monkeypatch.setattr(wc.api, "request_kube_api", mock.request_kube_api)
+    monkeypatch.setattr(wc.api, "watch_kube_api", mock.watch_kube_api)
+    return mock
+
+
+@pytest.fixture
+def cache():
+    return wc.WorkloadCache(
+        {
+            "Deployment": wc.WORKLOAD_PATHS["Deployment"],
+            "ReplicaSet": wc.WORKLOAD_PATHS["ReplicaSet"],
+        }
+    )
+
+
+def test_get_images_not_started(cache):
+    assert cache.get_images(*deployment_key) is None
+
+
+def test_refresh(cache, mock_kube_api):
+    cache.refresh("Deployment")
+    assert cache.get_images(*deployment_key) == images
+    assert cache.resource_versions["Deployment"] == "10"
+
+
+def test_refresh_pages(cache, mock_kube_api):
+    cache.refresh("ReplicaSet")
+    assert mock_kube_api.requests == [
+        "apis/apps/v1/replicasets?limit=500",
+        "apis/apps/v1/replicasets?limit=500&continue=next%2Fpage",
+    ]
+    assert cache.get_images(*replicaset_key) == images
+    assert cache.resource_versions["ReplicaSet"] == "21"
+
+
+def test_get_images_other_uid(cache, mock_kube_api):
+    cache.refresh("Deployment")
+    assert cache.get_images(*deployment_key[:3], "other-uid") is None
+
+
+def with_resource_version(workload: dict, resource_version: str, image: str = None):
+    workload = json.loads(json.dumps(workload))
+    workload["metadata"]["resourceVersion"] = resource_version
+    if image:
+        workload["spec"]["template"]["spec"]["containers"][0]["image"] = image
+    return workload
+
+
+def test_handle_event(cache, mock_kube_api):
+    cache.refresh("Deployment")
+    cache.handle_event(
+        "Deployment",
+        {"type": "MODIFIED", "object": with_resource_version(deployment, "11", "new")},
+    )
+    assert cache.get_images(*deployment_key) == ["new"]
+    assert cache.resource_versions["Deployment"] == "11"
+
+    cache.handle_event(
+        "Deployment",
+        {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "12"}}},
+    )
+    assert cache.resource_versions["Deployment"] == "12"
+
+    cache.handle_event(
+        "Deployment",
+        {"type": "DELETED", "object": with_resource_version(deployment, "13")},
+    )
+    assert cache.get_images(*deployment_key) is None
+    assert cache.resource_versions["Deployment"] == "13"
+
+
+def test_handle_event_error(cache, mock_kube_api):
+    cache.refresh("Deployment")
+    with pytest.raises(BaseConnaisseurException) as err:
+        cache.handle_event("Deployment", {"type": "ERROR", "object": {"code": 410}})
+    assert "watching the Deployment workloads failed." in str(err.value)
+
+
+def test_watch(cache, mock_kube_api):
+    mock_kube_api.events = [
+        {"type": "ADDED", "object": with_resource_version(deployment, "11", "new")}
+    ]
+    cache.watch("Deployment")
+    assert mock_kube_api.requests == [
+        "apis/apps/v1/deployments?limit=500",
+        ("apis/apps/v1/deployments", "10"),
+    ]
+    assert cache.get_images(*deployment_key) == ["new"]
+
+
+@pytest.mark.parametrize("enabled, started", [("1", True), ("0", False)])
+def test_start(cache, mocker, monkeypatch, enabled: str, started: bool):
+    monkeypatch.setenv("WORKLOAD_CACHE", enabled)
+    mock_start = mocker.patch("threading.Thread.start")
+    cache.start()
+    cache.start()
+    assert mock_start.call_count == (2 if started else 0)
+
+
+def test_run_not_served(cache, mocker):
+    response = requests.Response()
+    response.status_code = 404
+    mock_watch = mocker.patch.object(
+        cache, "watch", side_effect=requests.exceptions.HTTPError(response=response)
+    )
+    mock_sleep = mocker.patch("time.sleep")
+    assert cache._run("Deployment") is None
+    mock_watch.assert_called_once_with("Deployment")
+    mock_sleep.assert_not_called()
+
+
+def test_run_retry(cache, mocker):
+    response = requests.Response()
+    response.status_code = 500
+    mocker.patch.object(
+        cache,
+        "watch",
+        side_effect=[
+            requests.exceptions.HTTPError(response=response),
+            KeyboardInterrupt,
+        ],
+    )
+    mock_sleep = mocker.patch("time.sleep")
+    with pytest.raises(KeyboardInterrupt):
+        cache._run("Deployment")
+    mock_sleep.assert_called_once_with(cache.retry_interval)
+    assert cache.resource_versions["Deployment"] is None
@@ -5,10 +5,9 @@ import hashlib
 from datetime import datetime
 import pytz
 from dateutil import parser
-from jsonschema import validate as json_validate
 from jsonschema import ValidationError as JValidationError
-from jsonschema import FormatChecker as JFormatChecker
 from connaisseur.key_store import KeyStore
+from connaisseur.schema import validate as validate_schema
 from connaisseur.crypto import verify_signature
 from connaisseur.exceptions import NotFoundException, ValidationError, NoSuchClassError
 
@@ -22,9 +21,11 @@ class TrustData:
     kind: str
     signed: dict
     signatures: list
+    raw: bytes = None
     schema_path: str = "connaisseur/res/{}_schema.json"
+    _signed_bytes: bytes = None
 
-    def __new__(cls, data: dict, role: str):
+    def __new__(cls, data: dict, role: str, raw: bytes = None):
         # pylint: disable=unused-argument
         classes = {
             "root": RootData,
@@ -43,12 +44,13 @@ class TrustData:
                 "could not find class with name {}.".format(role)
             ) from err
 
-    def __init__(self, data: dict, role: str):
+    def __init__(self, data: dict, role: str, raw: bytes = None):
         self.schema_path = self.schema_path.format(role)
         self.kind = role
         self._validate_schema(data)
         self.signed = data["signed"]
         self.signatures = data["signatures"]
+        self.raw = raw
 
     def _validate_schema(self, data: dict):
         """
@@ -56,11 +58,8 @@ class TrustData:
 
         Raises a `ValidationError` should the schema not conform.
         """
-        with open(self.schema_path, "r") as schema_file:
-            schema = json.load(schema_file)
-
         try:
-            json_validate(instance=data, schema=schema, format_checker=JFormatChecker())
+            validate_schema(data, self.schema_path, check_formats=True)
         except JValidationError as err:
             raise ValidationError(
                 "trust data has invalid format.", {"trust_data_type": self.kind}
@@ -81,7 +80,7 @@ class TrustData:
 
         Raises a `ValidationError` should the date be expired.
         """
-        expire = parser.parse(self.signed.get("expires"))
+        expire = self.get_expiry()
         now = datetime.now(pytz.utc)
 
         if expire < now:
@@ -90,6 +89,12 @@ class TrustData:
                 {"expire": str(expire), "trust_data_type": self.signed.get("_type")},
             )
 
+    def get_expiry(self):
+        """
+        Returns the expiry date of the trust data.
+        """
+        return parser.parse(self.signed.get("expires"))
+
     def validate_signature(self, keystore: KeyStore):
         """
         Validates the signature of the trust data, using keys from a
@@ -97,7 +102,7 @@ class TrustData:
 
         Raises a `ValidationError` should the the signature be faulty.
         """
-        msg = json.dumps(self.signed, separators=(",", ":"))
+        msg = self.get_signed_bytes()
         for signature in self.signatures:
             key_id = "root" if self.kind == "root" else signature["keyid"]
             pub_key = keystore.get_key(key_id)
@@ -118,8 +123,12 @@ class TrustData:
 
         Raises a `ValidationError` should the hashes not match.
         """
-        data = {"signed": self.signed, "signatures": self.signatures}
-        data_dump = bytearray(json.dumps(data, separators=(",", ":")), "utf-8")
+        # the hash was calculated over the document as served by the notary, so
+        # the raw bytes are used directly, if available
+        data_dump = self.raw
+        if data_dump is None:
+            data = {"signed": self.signed, "signatures": self.signatures}
+            data_dump = json.dumps(data, separators=(",", ":")).encode()
 
         hash_b64, len_ = keystore.get_hash(self.kind)
         hash_ = base64.b64decode(hash_b64).hex()
@@ -138,6 +147,16 @@ class TrustData:
                 },
             )
 
+    def get_signed_bytes(self):
+        """
+        Returns the canonical serialization of the trust data's signed part,
+        over which the signatures were created. The signed part is only
+        serialized once.
+        """
+        if self._signed_bytes is None:
+            self._signed_bytes = json.dumps(self.signed, separators=(",", ":")).encode()
+        return self._signed_bytes
+
     def get_keys(self):
         """
         Returns all keys found in the trust data.
@@ -179,9 +198,11 @@ class TimestampData(TrustData):  # pylint: disable=abstract-method
 
 
 class TargetsData(TrustData):  # pylint: disable=abstract-method
-    def __init__(self, data: dict, role: str):
+    _digest_index: dict = None
+
+    def __init__(self, data: dict, role: str, raw: bytes = None):
         self.schema_path = "connaisseur/res/targets_schema.json"
-        super().__init__(data, role)
+        super().__init__(data, role, raw)
 
     def has_delegations(self):
         """
@@ -206,6 +227,25 @@ class TargetsData(TrustData):  # pylint: disable=abstract-method
                 'could not find digest for tag "{}".'.format(tag)
             ) from err
 
+    def get_tags_for_digest(self, digest: str):
+        """
+        Returns all tags, which are signed with the given hex-encoded `digest`.
+        """
+        return self.get_digest_index().get(digest, [])
+
+    def get_digest_index(self):
+        """
+        Returns a mapping of all hex-encoded digests to the tags signed with
+        them. The index is built only once per trust data.
+        """
+        if self._digest_index is None:
+            index = {}
+            for tag, target in self.signed.get("targets", {}).items():
+                digest = base64.b64decode(target["hashes"]["sha256"]).hex()
+                index.setdefault(digest, []).append(tag)
+            self._digest_index = index
+        return self._digest_index
+
     def get_keys(self):
         """
         Returns all keys found in the trust data.
@@ -0,0 +1,139 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from connaisseur.cache import TTLCache
+from connaisseur.image import Image
+from connaisseur.trust_data import TrustData
+from connaisseur.util import safe_path_func
+
+
+class TUFMetadataStore:
+    """
+    Keeps the validated trust data of images in memory, keyed by notary server
+    (`host`) and the image's globally unique name (GUN), so that unchanged
+    trust data doesn't need to be requested again. At most `maxsize` GUNs are
+    kept, the least recently used ones are evicted first.
+
+    Should a `directory` be given, the trust data is additionally written to
+    disk, so that it survives the in-memory cache.
+
+    The stored trust data isn't trusted on its own. It has to be validated
+    again, before being used.
+    """
+
+    directory: str
+
+    def __init__(self, maxsize: int, directory: str = None):
+        self._cache = TTLCache(maxsize=maxsize)
+        self.directory = os.path.realpath(directory) if directory else None
+
+    @staticmethod
+    def get_gun(image: Image):
+        """
+        Returns the globally unique name of the `image`, under which its
+        trust data is kept by the notary server.
+        """
+        if image.repository:
+            return f"{image.registry}/{image.repository}/{image.name}"
+        return f"{image.registry}/{image.name}"
+
+    def get(self, host: str, image: Image):
+        """
+        Returns the stored trust data of the `image` as a `dict`, keyed by TUF
+        role, or `None` should there be none.
+        """
+        key = (host, TUFMetadataStore.get_gun(image))
+        trust_data = self._cache.get(key)
+        if trust_data is None and self.directory:
+            trust_data = self._load(key)
+            if trust_data is not None:
+                self._cache.set(key, trust_data)
+        return None if trust_data is None else dict(trust_data)
+
+    def set(self, host: str, image: Image, trust_data: dict):
+        """
+        Stores the validated `trust_data` of the `image`.
+        """
+        key = (host, TUFMetadataStore.get_gun(image))
+        self._cache.set(key, dict(trust_data))
+        if self.directory:
+            self._dump(key, trust_data)
+
+    def delete(self, host: str, image: Image):
+        """
+        Removes the stored trust data of the `image`, from memory and disk.
+        """
+        key = (host, TUFMetadataStore.get_gun(image))
+        self._cache.pop(key)
+        if self.directory:
+            try:
+                safe_path_func(os.remove, self.directory, self._get_path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as err:
+                logging.warning("failed to remove stored trust data: %s", err)
+
+    def clear(self):
+        """
+        Removes all trust data kept in memory.
+        """
+        self._cache.clear()
+
+    def _get_path(self, key: tuple):
+        name = hashlib.sha256("/".join(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _load(self, key: tuple):
+        try:
+            with safe_path_func(open, self.directory, self._get_path(key), "r") as file:
+                data = json.load(file)
+            return {
+                role: (
+                    None
+                    if role_data is None
+                    else TUFMetadataStore._load_role(role_data, role)
+                )
+                for role, role_data in data.items()
+            }
+        except FileNotFoundError:
+            return None
+        except Exception as err:  # pylint: disable=broad-except
+            logging.warning("failed to load stored trust data: %s", err)
+            return None
+
+    @staticmethod
+    def _load_role(role_data: dict, role: str):
+        raw = role_data.pop("raw", None)
+        return TrustData(
+            role_data, role, None if raw is None else base64.b64decode(raw)
+        )
+
+    @staticmethod
+    def _dump_role(role_data: TrustData):
+        data = {"signed": role_data.signed, "signatures": role_data.signatures}
+        # the original bytes are kept, since the hashes of the trust data are
+        # calculated over them
+        if role_data.raw is not None:
+            data["raw"] = base64.b64encode(role_data.raw).decode()
+        return data
+
+    def _dump(self, key: tuple, trust_data: dict):
+        data = {
+            role: None if role_data is None else TUFMetadataStore._dump_role(role_data)
+            for role, role_data in trust_data.items()
+        }
+        tmp_path = None
+        try:
+            # write to a temporary file first, so that concurrent readers never
+            # see a partially written file
+            file_descriptor, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(data, file)
+            os.replace(tmp_path, self._get_path(key))
+        except OSError as err:
+            logging.warning("failed to store trust data: %s", err)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
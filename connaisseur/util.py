@@ -1,3 +1,5 @@
+import base64
+import json
 import os
 from connaisseur.exceptions import InvalidFormatException
 
@@ -13,3 +15,59 @@ def safe_path_func(callback: callable, base_dir: str, path: str, *args, **kwargs
     if os.path.commonprefix((os.path.realpath(path), base_dir)) != base_dir:
         raise InvalidFormatException("potential path traversal.", {"path": path})
     return callback(path, *args, **kwargs)
+
+
+def get_file_signature(path: str):
+    """
+    Returns the inode, modification time and size of the file at `path`, which
+    change with each update of the file, or `None` should there be no file.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def get_token_expiry(token: str):
+    """
+    Returns the time at which the JWT `token` expires, taken from its `exp`
+    claim, or `None` should the token not be a JWT with such claim.
+    """
+    try:
+        payload = token.split(".")[1]
+        # restore the base64 padding, which JWTs omit
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def get_container_specs(request_object: dict):
+    """
+    Returns the container specifications of the `request_object`, based on its
+    type.
+    """
+    object_kind = request_object.get("kind")
+    if object_kind == "Pod":
+        relevant_spec = request_object["spec"]
+        init_containers = relevant_spec.get("initContainers", [])
+        return relevant_spec["containers"] + init_containers
+    elif object_kind == "CronJob":
+        relevant_spec = request_object["spec"]["jobTemplate"]["spec"]["template"][
+            "spec"
+        ]
+        init_containers = relevant_spec.get("initContainers", [])
+        return relevant_spec["containers"] + init_containers
+    elif object_kind in (
+        "Deployment",
+        "ReplicationController",
+        "ReplicaSet",
+        "DaemonSet",
+        "StatefulSet",
+        "Job",
+    ):
+        relevant_spec = request_object["spec"]["template"]["spec"]
+        init_containers = relevant_spec.get("initContainers", [])
+        return relevant_spec["containers"] + init_containers
+    return []
@@ -1,14 +1,44 @@
 import base64
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pytz
+from connaisseur.cache import TTLCache
 from connaisseur.image import Image
 from connaisseur.key_store import KeyStore
 from connaisseur.util import normalize_delegation
 from connaisseur.notary_api import get_trust_data, get_delegation_trust_data
 from connaisseur.sigstore_validator import get_cosign_validated_digests
 from connaisseur.tuf_role import TUFRole
+from connaisseur.tuf_store import TUFMetadataStore
+from connaisseur.trust_data import TargetsData
 from connaisseur.exceptions import (
     AmbiguousDigestError,
     NotFoundException,
+    ValidationError,
+)
+
+# verified digests, keyed by notary host, image and required delegations. entries
+# live no longer than `DIGEST_CACHE_TTL` seconds or the earliest expiry of the trust
+# data they were taken from
+DIGEST_CACHE = TTLCache(
+    maxsize=int(os.environ.get("DIGEST_CACHE_SIZE", "512")),
+    ttl=float(os.environ.get("DIGEST_CACHE_TTL", "30")),
+)
+
+
+# bounded pool of threads, which concurrently request trust data from the notary
+FETCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("NOTARY_FETCH_WORKERS", "8")),
+    thread_name_prefix="notary-fetch",
+)
+
+# validated trust data, keyed by notary host and GUN. it is reused as long as the
+# snapshot referenced by the current timestamp doesn't change
+TUF_METADATA_STORE = TUFMetadataStore(
+    maxsize=int(os.environ.get("TUF_METADATA_CACHE_SIZE", "256")),
+    directory=os.environ.get("TUF_METADATA_DIR"),
 )
 
 
@@ -19,7 +49,9 @@ def get_trusted_digest(host: str, image: Image, policy_rule: dict):
     `policy_rule` complies.
 
     Returns the signed digest, belonging to the `image` or throws if validation fails.
+    Successfully verified digests are cached in the `DIGEST_CACHE`.
     """
+    cache_key, expiry = None, None
     if os.environ.get("IS_COSIGN", "0") == "1":
         # validate with cosign
         pubkey = KeyStore().keys["root"]
@@ -30,9 +62,18 @@ def get_trusted_digest(host: str, image: Image, policy_rule: dict):
             map(normalize_delegation, policy_rule.get("delegations", []))
         )
 
+        cache_key = (host, str(image), tuple(req_delegations))
+        cached_digest = DIGEST_CACHE.get(cache_key)
+        if cached_digest:
+            return cached_digest
+
         # get list of targets fields, containing tag to signed digest mapping from
         # `targets.json` and all potential delegation roles
-        signed_image_targets = process_chain_of_trust(host, image, req_delegations)
+        trust_data = get_validated_trust_data(host, image, req_delegations)
+        signed_image_targets = get_image_targets_data(
+            trust_data, image, req_delegations
+        )
+        expiry = get_earliest_expiry(trust_data)
 
         # search for digests or tag, depending on given image
         search_image_targets = (
@@ -72,39 +113,47 @@ def get_trusted_digest(host: str, image: Image, policy_rule: dict):
     if len(digests) > 1:
         raise AmbiguousDigestError("found multiple signed digests for the same image.")
 
-    return digests.pop()
+    digest = digests.pop()
+    if cache_key:
+        ttl = (expiry - datetime.now(pytz.utc)).total_seconds()
+        DIGEST_CACHE.set(cache_key, digest, ttl=ttl)
+
+    return digest
 
 
-def process_chain_of_trust(
-    host: str, image: Image, req_delegations: list
-):  # pylint: disable=too-many-branches
+def get_validated_trust_data(host: str, image: Image, req_delegations: list):
     """
-    Processes the whole chain of trust, provided by the notary server (`host`)
-    for any given `image`. The 'root', 'snapshot', 'timestamp', 'targets' and
-    potentially 'targets/releases' are requested and validated.
-    Additionally, it is checked whether all required delegations are valid.
+    Requests and validates the trust data of all TUF roles for the given
+    `image` from the notary server (`host`) and checks whether all required
+    delegations are present.
 
-    Returns the signed image targets, which contain the digests.
+    Returns the validated trust data as a `dict`, keyed by TUF role. Delegation
+    roles without any trust data map to `None`.
 
-    Raises `NotFoundExceptions` should no required delegetions be present in
-    the trust data, or no image targets be found.
+    Should the validation fail, the stored trust data of the `image` is
+    dropped, so it's requested anew next time.
     """
-    trust_data = {}
+    try:
+        return _validate_trust_data(host, image, req_delegations)
+    except Exception:
+        TUF_METADATA_STORE.delete(host, image)
+        raise
+
+
+def _validate_trust_data(host: str, image: Image, req_delegations: list):
     key_store = KeyStore()
 
     tuf_roles = ["root", "snapshot", "timestamp", "targets"]
 
-    # load all trust data
-    for role in tuf_roles:
-        trust_data[role] = get_trust_data(host, image, TUFRole(role))
+    # load all trust data, or only the timestamp should the snapshot be unchanged
+    trust_data = load_trust_data(host, image, tuf_roles)
 
     # validate signature and expiry data of and load root file
     # this does NOT conclude the validation of the root file. To prevent roleback/freeze attacks,
     # the hash still needs to be validated against the snapshot file
-    root_trust_data = get_trust_data(host, image, TUFRole("root"))
+    root_trust_data = trust_data["root"]
     root_trust_data.validate_signature(key_store)
     root_trust_data.validate_expiry()
-    trust_data["root"] = root_trust_data
     key_store.update(root_trust_data)
 
     # validate timestamp file to prevent freeze attacks
@@ -151,6 +200,50 @@ def process_chain_of_trust(
     # validate existence of required delegations
     _validate_all_required_delegations_present(req_delegations, delegations)
 
+    TUF_METADATA_STORE.set(host, image, trust_data)
+    return trust_data
+
+
+def load_trust_data(host: str, image: Image, roles: list):
+    """
+    Loads the trust data of all given `roles` for the `image`. Should there
+    be stored trust data for the `image`, only the timestamp is requested from
+    the notary server (`host`). As long as the timestamp still references the
+    stored snapshot, the stored trust data is reused. Otherwise all other
+    `roles` are requested concurrently.
+
+    The returned trust data is NOT validated.
+    """
+    stored_trust_data = TUF_METADATA_STORE.get(host, image)
+    if not stored_trust_data:
+        return fetch_trust_data(host, image, roles, get_trust_data)
+
+    timestamp_trust_data = get_trust_data(host, image, TUFRole("timestamp"))
+    timestamp_key_store = KeyStore()
+    timestamp_key_store.update(timestamp_trust_data)
+    try:
+        stored_trust_data["snapshot"].validate_hash(timestamp_key_store)
+        trust_data = stored_trust_data
+    except (ValidationError, NotFoundException):
+        trust_data = fetch_trust_data(
+            host,
+            image,
+            [role for role in roles if role != "timestamp"],
+            get_trust_data,
+            _get_max_lengths(timestamp_key_store, ["snapshot"]),
+        )
+
+    trust_data["timestamp"] = timestamp_trust_data
+    return trust_data
+
+
+def get_image_targets_data(trust_data: dict, image: Image, req_delegations: list):
+    """
+    Returns the targets trust data from the validated `trust_data`, whose
+    image targets are relevant for the `image` and its required delegations.
+
+    Raises a `NotFoundException` should no image targets be found.
+    """
     # if certain delegations are required, then only take the targets fields of the
     # required delegation JSONs. otherwise take the targets field of the targets JSON, as
     # long as no delegations are defined in the targets JSON. should there be delegations
@@ -168,10 +261,7 @@ def process_chain_of_trust(
             msg = f"no trust data for delegation roles {tuf_roles} for image {image}"
             raise NotFoundException(msg, {"tuf_roles": tuf_roles})
 
-        image_targets = [
-            trust_data[target_role].signed.get("targets", {})
-            for target_role in req_delegations
-        ]
+        image_targets = [trust_data[target_role] for target_role in req_delegations]
     else:
         targets_key = (
             "targets/releases"
@@ -179,42 +269,87 @@ def process_chain_of_trust(
             and trust_data["targets/releases"]
             else "targets"
         )
-        image_targets = [trust_data[targets_key].signed.get("targets", {})]
+        image_targets = [trust_data[targets_key]]
 
-    if not any(image_targets):
+    if not any(data.signed.get("targets") for data in image_targets):
         raise NotFoundException("could not find any image digests in trust data.")
 
     return image_targets
 
 
-def search_image_targets_for_digest(trust_data: dict, image: Image):
+def get_earliest_expiry(trust_data: dict):
+    """
+    Returns the earliest expiry date among all given `trust_data`.
+    """
+    return min(data.get_expiry() for data in trust_data.values() if data)
+
+
+def search_image_targets_for_digest(trust_data: TargetsData, image: Image):
     """
-    Searches in the `trust_data` for a signed digest, given an `image` with
-    digest.
+    Searches in the targets `trust_data` for a signed digest, given an `image`
+    with digest.
     """
-    image_digest = base64.b64encode(bytes.fromhex(image.digest)).decode("utf-8")
-    if image_digest in {data["hashes"]["sha256"] for data in trust_data.values()}:
+    tags = trust_data.get_tags_for_digest(image.digest)
+    if tags:
+        logging.debug(
+            "digest %s of image %s is signed for tags %s.", image.digest, image, tags
+        )
         return image.digest
 
     return None
 
 
-def search_image_targets_for_tag(trust_data: dict, image: Image):
+def search_image_targets_for_tag(trust_data: TargetsData, image: Image):
     """
-    Searches in the `trust_data` for a digest, given an `image` with tag.
+    Searches in the targets `trust_data` for a digest, given an `image` with
+    tag.
     """
-    image_tag = image.tag
-    if image_tag not in trust_data:
+    image_targets = trust_data.signed.get("targets", {})
+    if image.tag not in image_targets:
         return None
 
-    base64_digest = trust_data[image_tag]["hashes"]["sha256"]
+    base64_digest = image_targets[image.tag]["hashes"]["sha256"]
     return base64.b64decode(base64_digest).hex()
 
 
+def fetch_trust_data(
+    host: str, image: Image, roles: list, fetch: callable, max_lengths: dict = None
+):
+    """
+    Concurrently requests the trust data of all given `roles` for the `image`
+    from the notary server (`host`), using the `fetch` function. Should the
+    length of a role's trust data be known from `max_lengths`, no larger
+    trust data is downloaded.
+
+    Returns the trust data as a `dict`, keyed by role. Raises the first error
+    that occurred, in order of the `roles`.
+    """
+    max_lengths = max_lengths or {}
+    trust_data = FETCH_EXECUTOR.map(
+        lambda role: fetch(
+            host, image, TUFRole(role), max_length=max_lengths.get(role)
+        ),
+        roles,
+    )
+    return dict(zip(roles, trust_data))
+
+
 def _update_with_delegation_trust_data(trust_data, delegations, key_store, host, image):
+    # only request delegations, which aren't already present from a previous
+    # validation
+    missing_delegations = [
+        delegation for delegation in delegations if trust_data.get(delegation) is None
+    ]
+    delegations_trust_data = fetch_trust_data(
+        host,
+        image,
+        missing_delegations,
+        get_delegation_trust_data,
+        _get_max_lengths(key_store, missing_delegations),
+    )
     for delegation in delegations:
-        delegation_trust_data = get_delegation_trust_data(
-            host, image, TUFRole(delegation)
+        delegation_trust_data = delegations_trust_data.get(
+            delegation, trust_data.get(delegation)
         )
         # when delegations are added to the repository, but weren't yet used for signing, the
         # delegation files don't exist yet and are `None`. in this case validation must be skipped
@@ -223,6 +358,15 @@ def _update_with_delegation_trust_data(trust_data, delegations, key_store, host,
         trust_data[delegation] = delegation_trust_data
 
 
+def _get_max_lengths(key_store: KeyStore, roles: list):
+    # lengths are optional in TUF metadata and are missing as `0` in the key store
+    return {
+        role: key_store.hashes[role][1]
+        for role in roles
+        if role in key_store.hashes and key_store.hashes[role][1]
+    }
+
+
 def _validate_all_required_delegations_present(
     required_delegations, present_delegations
 ):
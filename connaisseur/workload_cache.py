@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import time
+from urllib.parse import quote
+import requests
+import connaisseur.kube_api as api
+from connaisseur.exceptions import NotFoundException
+from connaisseur.util import get_container_specs
+
+# workload kinds, which are cached, and the paths to request them from across
+# all namespaces. the API versions match the `SUPPORTED_API_VERSIONS` of the
+# mutate module
+WORKLOAD_PATHS = {
+    "Deployment": "apis/apps/v1/deployments",
+    "ReplicaSet": "apis/apps/v1/replicasets",
+    "StatefulSet": "apis/apps/v1/statefulsets",
+    "DaemonSet": "apis/apps/v1/daemonsets",
+    "Job": "apis/batch/v1/jobs",
+    "CronJob": "apis/batch/v1beta1/cronjobs",
+}
+
+
+class WorkloadCache:
+    """
+    Keeps the container images of all workload objects in the cluster in
+    memory, so the parent objects of new pods and replica sets don't need to
+    be requested for each admission request. Once started, a background
+    thread per workload kind lists all objects of the kind and watches them
+    for changes, similar to a kubernetes informer.
+
+    Only the images are kept, keyed by namespace, kind, name and uid of
+    their object. As long as the cache isn't started or a kind couldn't be
+    listed yet, `get_images` returns `None` for it. Kinds the cluster doesn't
+    serve are not watched at all.
+    """
+
+    retry_interval: int = 5
+    page_size: int = 500
+
+    def __init__(self, kinds: dict = None):
+        self.paths = kinds or WORKLOAD_PATHS
+        self.images = {}
+        self.resource_versions = {}
+        self._threads = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts watching all workload kinds, should the cache be enabled by
+        setting the `WORKLOAD_CACHE` environment variable to "1".
+        """
+        if os.environ.get("WORKLOAD_CACHE", "0") != "1":
+            return
+        with self._lock:
+            if self._threads is not None:
+                return
+            self._threads = [
+                threading.Thread(
+                    target=self._run,
+                    args=(kind,),
+                    name=f"workload-watcher-{kind.lower()}",
+                    daemon=True,
+                )
+                for kind in self.paths
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def get_images(self, namespace: str, kind: str, name: str, uid: str):
+        """
+        Returns the `list` of container images of the workload object, or
+        `None` should the object not be cached.
+        """
+        images = self.images.get(kind)
+        if images is None:
+            return None
+        return images.get((namespace, name, uid))
+
+    def refresh(self, kind: str):
+        """
+        Lists all objects of the workload `kind` from the kubernetes API and
+        replaces the cached images of the kind with theirs.
+        """
+        path = self.paths[kind]
+        images, continue_token = {}, None
+        while True:
+            query = f"?limit={self.page_size}"
+            if continue_token:
+                query += f"&continue={quote(continue_token, safe='')}"
+            workloads = api.request_kube_api(path + query)
+            for workload in workloads["items"]:
+                images[self._get_key(workload)] = self._get_images(kind, workload)
+            continue_token = workloads["metadata"].get("continue")
+            if not continue_token:
+                break
+
+        self.images[kind] = images
+        self.resource_versions[kind] = workloads["metadata"]["resourceVersion"]
+
+    def handle_event(self, kind: str, event: dict):
+        """
+        Processes a watch `event` of a workload object of the given `kind`.
+        """
+        event_type, workload = event["type"], event["object"]
+        if event_type in ("ADDED", "MODIFIED"):
+            self.images[kind][self._get_key(workload)] = self._get_images(
+                kind, workload
+            )
+        elif event_type == "DELETED":
+            self.images[kind].pop(self._get_key(workload), None)
+        elif event_type != "BOOKMARK":
+            # most likely the resource version is too old, so the objects have to
+            # be listed again
+            raise NotFoundException(
+                f"watching the {kind} workloads failed.", {"event": event}
+            )
+        self.resource_versions[kind] = workload["metadata"]["resourceVersion"]
+
+    def watch(self, kind: str):
+        """
+        Watches the objects of the workload `kind` for changes, until the
+        kubernetes API closes the connection.
+        """
+        if self.resource_versions.get(kind) is None:
+            self.refresh(kind)
+
+        for event in api.watch_kube_api(self.paths[kind], self.resource_versions[kind]):
+            self.handle_event(kind, event)
+
+    def _run(self, kind: str):
+        while True:
+            try:
+                self.watch(kind)
+            except requests.exceptions.HTTPError as err:
+                if err.response is not None and err.response.status_code == 404:
+                    logging.warning(
+                        "%s workloads aren't served by the cluster and won't be cached.",
+                        kind,
+                    )
+                    return
+                logging.error("error while watching %s workloads: %s", kind, err)
+                self.resource_versions[kind] = None
+                time.sleep(self.retry_interval)
+            except Exception as err:  # pylint: disable=broad-except
+                logging.error("error while watching %s workloads: %s", kind, err)
+                self.resource_versions[kind] = None
+                time.sleep(self.retry_interval)
+
+    @staticmethod
+    def _get_key(workload: dict):
+        metadata = workload["metadata"]
+        return metadata.get("namespace"), metadata["name"], metadata["uid"]
+
+    @staticmethod
+    def _get_images(kind: str, workload: dict):
+        # listed objects don't carry their kind
+        containers = get_container_specs(dict(workload, kind=kind))
+        return [container["image"] for container in containers]
+
+
+WORKLOAD_CACHE = WorkloadCache()
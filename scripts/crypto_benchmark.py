@@ -0,0 +1,51 @@
+"""
+Micro-benchmark of the signature verification backends in `connaisseur.crypto`.
+
+Run from the `connaisseur` directory of the repository, so the test trust data
+can be found:
+
+    cd connaisseur && PYTHONPATH=.. python ../scripts/crypto_benchmark.py [iterations]
+"""
+
+import base64
+import json
+import sys
+import timeit
+
+from connaisseur.crypto import CRYPTOGRAPHY_BACKEND, ECDSA_BACKEND, ec
+
+TRUST_DATA_PATH = "tests/data/sample-image"
+
+
+def get_signature():
+    with open(f"{TRUST_DATA_PATH}/root.json", "r") as file:
+        keys = json.load(file)["signed"]["keys"]
+    with open(f"{TRUST_DATA_PATH}/targets.json", "r") as file:
+        data = json.load(file)
+
+    signature = data["signatures"][0]
+    public = keys[signature["keyid"]]["keyval"]["public"]
+    message = json.dumps(data["signed"], separators=(",", ":")).encode()
+    return public, base64.b64decode(signature["sig"]), message
+
+
+def benchmark(backend, iterations: int):
+    public, signature, message = get_signature()
+    key = backend.load_key(public)
+    seconds = timeit.timeit(
+        lambda: backend.verify(key, signature, message), number=iterations
+    )
+    return seconds / iterations * 1000
+
+
+if __name__ == "__main__":
+    ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    backends = [ECDSA_BACKEND]
+    if ec is not None:
+        backends.append(CRYPTOGRAPHY_BACKEND)
+
+    results = {backend.name: benchmark(backend, ITERATIONS) for backend in backends}
+    for name, milliseconds in results.items():
+        speedup = results["ecdsa"] / milliseconds
+        print(f"{name:>12}: {milliseconds:.3f} ms per verification ({speedup:.1f}x)")